@@ -0,0 +1,512 @@
+# benchmark.py
+"""
+Benchmarks for the API.
+
+    # compare the sync and async database layers on the same data
+    python benchmark.py http \
+        --database-url sqlite:///./cinema.db \
+        --database-url sqlite+aiosqlite:///./cinema.db \
+        --path "/showtimes?limit=50" --clients 200 --duration 15
+
+Each --database-url starts its own uvicorn server, hammers it with
+--clients concurrent keep-alive clients and reports requests/sec and
+latency percentiles. Pass --url instead to load an already running server.
+
+    # ORM + Pydantic vs column-projected rendering of /showtimes
+    DATABASE_URL=sqlite:///./cinema.db python benchmark.py readpath --limit 500
+
+readpath renders the same pages through both paths against DATABASE_URL,
+checks that the bytes are identical and reports ms per page.
+
+    # SQL statements and rows behind one /showtimes page
+    DATABASE_URL=sqlite:///./cinema.db python benchmark.py queries --limit 100
+
+queries exits non-zero if a page takes more statements than expected or
+the main query returns more rows than showtimes (eager-load row explosion).
+
+    # per-row legacy seeder vs batched bulk seeder
+    python benchmark.py seed --movies 60
+
+seed writes synthetic prime/legend/major JSON files and seeds each into a
+fresh SQLite database (or --database-url) with both seeders, then reseeds
+the unchanged files with and without content fingerprints.
+
+    # Major scraper against a local stub of its API
+    python benchmark.py major --latency 0.2 --workers 8 --rate 20 --fail-every 7
+
+major serves synthetic cinemas/dates/showtimes with the given latency
+(and a 503 on every Nth request, to exercise retries), runs the scraper
+sequentially and concurrently, then twice more through an empty and a
+warm HTTP cache (the stub sends ETags and Cache-Control: max-age), and
+checks that every run writes the same records.
+"""
+import hashlib
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+
+# -------------------------------------------------------
+# LOAD GENERATOR
+# -------------------------------------------------------
+async def _client(http, url, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await http.get(url)
+            r.raise_for_status()
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run_load(url: str, clients: int, duration: float) -> dict:
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        # warm up pools and caches before measuring
+        await http.get(url)
+
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            _client(http, url, deadline, latencies, errors)
+            for _ in range(clients)
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+# -------------------------------------------------------
+# SERVER MANAGEMENT
+# -------------------------------------------------------
+def start_server(database_url: str, port: int, workers: int):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/providers", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+    proc.terminate()
+    raise RuntimeError(f"server for {database_url} did not start")
+
+
+def print_row(label, res):
+    print(
+        f"{label:<45} {res['rps']:>9.1f} req/s  "
+        f"p50 {res['p50_ms']:>7.1f} ms  p99 {res['p99_ms']:>7.1f} ms  "
+        f"({res['requests']} ok, {res['errors']} errors)"
+    )
+
+
+def cmd_http(args):
+    if args.url:
+        print_row(args.url, asyncio.run(run_load(args.url, args.clients, args.duration)))
+        return
+
+    for database_url in args.database_url:
+        proc = start_server(database_url, args.port, args.workers)
+        try:
+            url = f"http://127.0.0.1:{args.port}{args.path}"
+            print_row(database_url, asyncio.run(run_load(url, args.clients, args.duration)))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+# -------------------------------------------------------
+# READ PATH
+# -------------------------------------------------------
+async def time_pages(render, db, limit: int, iterations: int):
+    """
+    Renders the first 20 pages `iterations` times.
+    Returns (seconds per page, bodies of the last round).
+    """
+    bodies = []
+    pages = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        bodies, cursor = [], None
+        while True:
+            body = await render(db, cursor, limit)
+            bodies.append(body)
+            pages += 1
+            cursor = json.loads(body)["next_cursor"]
+            if not cursor or len(bodies) >= 20:
+                break
+    return (time.perf_counter() - start) / pages, bodies
+
+
+def cmd_readpath(args):
+    import main
+    import fast_read
+    from database import SessionLocal
+
+    async def run():
+        db = SessionLocal()
+        try:
+            orm_s, orm_bodies = await time_pages(main.showtimes_page_orm, db, args.limit, args.iterations)
+            fast_s, fast_bodies = await time_pages(fast_read.showtimes_page, db, args.limit, args.iterations)
+        finally:
+            db.close()
+
+        identical = orm_bodies == fast_bodies
+        print(f"{'orm + pydantic':<20} {orm_s * 1000:>9.2f} ms/page")
+        print(f"{'core + orjson':<20} {fast_s * 1000:>9.2f} ms/page  ({orm_s / fast_s:.1f}x)")
+        print(f"byte-identical: {identical} ({len(orm_bodies)} pages of {args.limit})")
+        if not identical:
+            sys.exit(1)
+
+    asyncio.run(run())
+
+
+# -------------------------------------------------------
+# STATEMENTS AND ROWS PER REQUEST
+# -------------------------------------------------------
+def capture_statements(engine):
+    """
+    Records (sql, params) of every SELECT run on `engine`.
+    Returns (captured list, detach callback).
+    """
+    from sqlalchemy import event
+
+    captured = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    return captured, lambda: event.remove(engine, "before_cursor_execute", before)
+
+
+def cmd_queries(args):
+    import main
+    import fast_read
+    from database import SessionLocal, engine
+
+    paths = [
+        ("orm", main.showtimes_page_orm),
+        ("core", fast_read.showtimes_page),
+    ]
+    ok = True
+
+    async def render(fn):
+        db = SessionLocal()
+        try:
+            return await fn(db, None, args.limit)
+        finally:
+            db.close()
+
+    for name, fn in paths:
+        # warm up the generation and search lookups so only the page is measured
+        asyncio.run(render(fn))
+
+        captured, detach = capture_statements(engine)
+        try:
+            body = asyncio.run(render(fn))
+        finally:
+            detach()
+
+        showtimes = len(json.loads(body)["items"])
+
+        # re-run each captured SELECT to count the raw rows it returned
+        with engine.connect() as conn:
+            rows = [len(conn.exec_driver_sql(sql, params).all()) for sql, params in captured]
+
+        print(f"{name:<5} {len(captured)} statements, rows {rows}, showtimes {showtimes}")
+
+        # page query (limit + 1 look-ahead) plus one booking-link query
+        if len(captured) > 2 or not rows or rows[0] > showtimes + 1:
+            ok = False
+
+    if not ok:
+        print("FAIL: extra statements or duplicated rows")
+        sys.exit(1)
+
+
+# -------------------------------------------------------
+# SEEDING
+# -------------------------------------------------------
+SEED_FILES = [
+    ("prime.json", "Prime", False),
+    ("legend.json", "Legend", True),
+    ("major.json", "Major", False),
+]
+
+
+def synthetic_document(prefix: str, movies: int, with_urls: bool) -> dict:
+    """
+    A scraper-shaped document: movies x 7 dates x 3 cinemas x 2 halls x 4 times.
+    """
+    first = date.today()
+    out = []
+    for i in range(movies):
+        dates = []
+        for d in range(7):
+            day = first + timedelta(days=d)
+            cinemas = []
+            for c in range(3):
+                sessions = []
+                for h in range(2):
+                    times = []
+                    for t in range(4):
+                        hhmm = f"{10 + t * 3 + h}:{c * 15:02d}"
+                        if with_urls:
+                            show = f"{day:%d-%b-%Y} {hhmm}:00"
+                            times.append({
+                                "time": hhmm,
+                                "url": f"https://example.com/book?m={i}&ShowDate={show.replace(' ', '%20')}",
+                            })
+                        else:
+                            times.append(hhmm)
+                    sessions.append({
+                        "version_label": "2D",
+                        "hall": f"H{h + 1}",
+                        "audio_language": None,
+                        "subtitle_language": None,
+                        "times": times,
+                    })
+                cinemas.append({"cinema_name": f"{prefix} Cinema {c}", "sessions": sessions})
+            dates.append({"date_label": day.isoformat(), "cinemas": cinemas})
+        out.append({"movie_title": f"{prefix} Movie {i}", "dates": dates})
+    return {"base_url": "https://example.com", "movies": out}
+
+
+def write_seed_files(directory: str, movies: int):
+    for file_name, prefix, with_urls in SEED_FILES:
+        with open(os.path.join(directory, file_name), "w", encoding="utf-8") as f:
+            json.dump(synthetic_document(prefix, movies, with_urls), f)
+
+
+def run_seeder(directory: str, database_url: str, extra_args: list) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "seed_from_json.py", "--dir", directory, *extra_args],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ, DATABASE_URL=database_url),
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def cmd_seed(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_seed_files(tmp, args.movies)
+        rows = args.movies * 7 * 3 * 2 * 4 * len(SEED_FILES)
+
+        # name, database, seeder arguments; the reseeds rerun the same files
+        # over the bulk database, with and without content fingerprints
+        jobs = ["--jobs", str(args.jobs)]
+        variants = [
+            ("bulk", "bulk", jobs),
+            ("reseed", "bulk", []),
+            ("reseed-full", "bulk", ["--no-fingerprints"]),
+        ]
+        if not args.skip_legacy:
+            variants.insert(0, ("legacy", "legacy", ["--legacy"]))
+
+        for name, db_name, extra in variants:
+            database_url = args.database_url or f"sqlite:///{os.path.join(tmp, db_name + '.db')}"
+            seconds = run_seeder(tmp, database_url, extra)
+            print(f"{name:<12} {seconds:>8.2f} s  {rows / seconds:>9.0f} rows/s  ({rows} rows)")
+
+
+# -------------------------------------------------------
+# MAJOR SCRAPER AGAINST A STUB API
+# -------------------------------------------------------
+def start_major_stub(latency: float, dates: int, fail_every: int, max_age: int = 0) -> ThreadingHTTPServer:
+    """
+    Serves /api/date-show-movie and /api/show-movie on a free local port,
+    with ETags (304 on If-None-Match) and Cache-Control: max-age.
+    """
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            with lock:
+                counter["n"] += 1
+                fail = fail_every and counter["n"] % fail_every == 0
+            if fail:
+                return self._send(503, {"error": "try again"})
+
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.endswith("/date-show-movie"):
+                first = date(2030, 1, 1)
+                return self._send(200, [
+                    f"{first + timedelta(days=d)}T00:00:00" for d in range(dates)
+                ])
+            if url.path.endswith("/show-movie"):
+                day = q["date"][:10]
+                return self._send(200, {"theaters": [
+                    {"name": f"Hall {h}", "movies": [
+                        {"title": f"Stub Movie {m}", "posterImage": f"/p/{m}.jpg",
+                         "category": "2D", "rating": "G",
+                         "movies": [{"showTime": f"{day}T{10 + 3 * k + h:02d}:{m * 5:02d}:00"} for k in range(3)]}
+                        for m in range(6)
+                    ]}
+                    for h in range(3)
+                ]})
+            self._send(404, {"error": "not found"})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status in (200, 304):
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"max-age={max_age}")
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.requests = counter
+    return server
+
+
+def cmd_major(args):
+    from http_client import HttpCache
+    from scraper import major_scraper as major
+    from sinks import NdjsonSink
+
+    server = start_major_stub(args.latency, args.dates, args.fail_every, args.max_age)
+    major.BASE = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    outputs, results = {}, []
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        runs = (
+            # sequential: one worker, effectively unlimited rate
+            ("sequential", 1, 1e6, None),
+            ("concurrent", args.workers, args.rate, None),
+            ("cache-cold", args.workers, args.rate, cache_dir),
+            ("cache-warm", args.workers, args.rate, cache_dir),
+        )
+        for name, workers, rate, cache_path in runs:
+            cache = HttpCache(cache_path) if cache_path else None
+            path = os.path.join(tmp, f"{name}.ndjson")
+            before = server.requests["n"]
+            start = time.perf_counter()
+            with NdjsonSink(path) as sink:
+                major.scrape(sink, major.MajorClient(workers, rate, cache=cache), workers)
+                records = sink.writer.count
+            seconds = time.perf_counter() - start
+            with open(path, "rb") as f:
+                outputs[name] = f.read()
+            stats = f"  {dict(cache.stats)}" if cache else ""
+            results.append(f"{name:<11} {seconds:>7.2f} s  {server.requests['n'] - before:>5} requests  "
+                           f"{records} records{stats}")
+
+    server.shutdown()
+    print("\n".join(results))
+    same = len(set(outputs.values())) == 1
+    print(f"identical output: {same}")
+    if not same:
+        sys.exit(1)
+
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    http = sub.add_parser("http", help="requests/sec under many concurrent clients")
+    http.add_argument("--url", help="benchmark an already running server")
+    http.add_argument("--database-url", action="append", default=[], help="start a server per DATABASE_URL")
+    http.add_argument("--path", default="/showtimes?limit=50")
+    http.add_argument("--clients", type=int, default=100)
+    http.add_argument("--duration", type=float, default=10.0)
+    http.add_argument("--port", type=int, default=8765)
+    http.add_argument("--workers", type=int, default=1)
+    http.set_defaults(func=cmd_http)
+
+    readpath = sub.add_parser("readpath", help="ORM vs Core rendering of /showtimes pages")
+    readpath.add_argument("--limit", type=int, default=500)
+    readpath.add_argument("--iterations", type=int, default=5)
+    readpath.set_defaults(func=cmd_readpath)
+
+    queries = sub.add_parser("queries", help="SQL statements and rows behind one /showtimes page")
+    queries.add_argument("--limit", type=int, default=100)
+    queries.set_defaults(func=cmd_queries)
+
+    seed = sub.add_parser("seed", help="legacy vs bulk seeder on synthetic data")
+    seed.add_argument("--movies", type=int, default=30, help="movies per provider")
+    seed.add_argument("--database-url", help="seed here instead of a temporary SQLite file")
+    seed.add_argument("--skip-legacy", action="store_true")
+    seed.add_argument("--jobs", type=int, default=1, help="providers seeded in parallel by the bulk run")
+    seed.set_defaults(func=cmd_seed)
+
+    major = sub.add_parser("major", help="Major scraper, sequential vs concurrent, against a stub API")
+    major.add_argument("--latency", type=float, default=0.2, help="stub response time in seconds")
+    major.add_argument("--dates", type=int, default=7, help="dates per cinema")
+    major.add_argument("--workers", type=int, default=8)
+    major.add_argument("--rate", type=float, default=20, help="requests per second")
+    major.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503")
+    major.add_argument("--max-age", type=int, default=0, help="stub Cache-Control max-age in seconds")
+    major.set_defaults(func=cmd_major)
+
+    args = parser.parse_args(argv)
+    if args.command == "http" and not (args.url or args.database_url):
+        parser.error("http needs --url or at least one --database-url")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
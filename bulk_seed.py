@@ -0,0 +1,419 @@
+# bulk_seed.py
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import AbstractSet, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, delete, insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models import Cinema, Movie, Showtime, BookingLink
+from crud import create_provider_if_not_exists, bump_generation
+from seed_profile import NULL_PROFILER
+
+# keys per IN (...) lookup; keeps bound parameters well under SQLite's limit
+LOOKUP_CHUNK = 500
+
+SHOWTIME_ATTRS = ("version_label", "hall_type", "audio_language", "subtitle_language")
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def insert_ignore(db: Session, model, rows: List[dict], chunk_size: int):
+    """
+    INSERT ... ON CONFLICT DO NOTHING on Postgres and SQLite, a plain
+    INSERT elsewhere. Each chunk is one executemany of a single compiled
+    statement (batched by the driver, insertmanyvalues on Postgres); a
+    multi-row VALUES would be compiled again for every chunk.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    for chunk in _chunks(rows, chunk_size):
+        if dialect_insert is None:
+            db.execute(insert(model), chunk)
+        else:
+            db.execute(dialect_insert(model).on_conflict_do_nothing(), chunk)
+
+
+def delete_ids(db: Session, model, ids: List[int]):
+    for chunk in _chunks(ids, LOOKUP_CHUNK):
+        db.execute(delete(model).where(model.id.in_(chunk)))
+
+
+class SeedScope(NamedTuple):
+    """
+    Part of a provider, e.g. one cinema's showtimes on one date. Fields
+    left None do not restrict. Dates are start_time dates; cinemas and
+    movies are external ids.
+    """
+    dates: Optional[AbstractSet[date]] = None
+    cinemas: Optional[AbstractSet[str]] = None
+    movies: Optional[AbstractSet[str]] = None
+
+    def showtime_filter(self, movie_ids: Dict[str, int], cinema_ids: Dict[str, int]) -> list:
+        conditions = []
+        if self.dates is not None:
+            conditions.append(or_(*[
+                and_(
+                    Showtime.start_time >= datetime.combine(d, time.min),
+                    Showtime.start_time < datetime.combine(d + timedelta(days=1), time.min),
+                )
+                for d in sorted(self.dates)
+            ]))
+        if self.cinemas is not None:
+            conditions.append(Showtime.cinema_id.in_(
+                [cinema_ids[c] for c in self.cinemas if c in cinema_ids]))
+        if self.movies is not None:
+            conditions.append(Showtime.movie_id.in_(
+                [movie_ids[m] for m in self.movies if m in movie_ids]))
+        return conditions
+
+
+class BulkSeeder:
+    """
+    Batched, diff-based ingestion for one provider.
+
+    The provider's current rows are loaded once into natural-key maps
+    (cinema external_id, movie external_id, cinema+movie+start_time,
+    showtime+url). Each batch of scraped rows then costs one batched
+    INSERT and one id lookup per table, plus a bulk UPDATE for showtimes
+    whose attributes changed. `finish()` deletes whatever the scrape no
+    longer contains, so existing ids stay stable across runs, and
+    commits the whole provider in one transaction.
+
+    With a `scope`, only the provider's showtimes (and booking links)
+    inside it are loaded and may be deleted, and movies and cinemas are
+    never deleted, since showtimes outside the scope may still use them.
+    The rows added should then all fall inside the scope.
+    """
+
+    def __init__(self, db: Session, provider_name: str, batch_size: int = 1000, profiler=NULL_PROFILER,
+                 scope: Optional[SeedScope] = None):
+        self.db = db
+        self.scope = scope
+        self.batch_size = batch_size
+        self.profiler = profiler
+        self.provider = create_provider_if_not_exists(db, provider_name, website_url=None)
+        self.provider_id = self.provider.id
+
+        self.pending = []
+        self.counts = Counter()
+        # per table: inserted / updated / deleted / unchanged
+        self.changes = {
+            "movies": Counter(),
+            "cinemas": Counter(),
+            "showtimes": Counter(),
+            "booking_links": Counter(),
+        }
+
+        with profiler.stage("load existing rows"):
+            self._load_existing()
+
+        self.seen_movies = set()
+        self.seen_cinemas = set()
+        self.seen_showtimes = set()
+        self.seen_links = set()
+
+        # built on the first keep_movie()
+        self._showtimes_by_movie = None
+
+    def _load_existing(self):
+        """Natural-key maps of the provider's current rows."""
+        db = self.db
+
+        self.movie_ids: Dict[str, int] = dict(db.execute(
+            select(Movie.external_id, Movie.id).where(Movie.provider_id == self.provider_id)
+        ).all())
+
+        self.cinema_ids: Dict[str, int] = dict(db.execute(
+            select(Cinema.external_id, Cinema.id).where(Cinema.provider_id == self.provider_id)
+        ).all())
+
+        in_scope = self.scope.showtime_filter(self.movie_ids, self.cinema_ids) if self.scope else []
+
+        # (cinema_id, movie_id, start_time) -> (id, version_label, hall_type, audio, subtitle)
+        self.showtimes: Dict[Tuple, Tuple] = {
+            (cinema_id, movie_id, start_time): (showtime_id, *attrs)
+            for showtime_id, cinema_id, movie_id, start_time, *attrs in db.execute(
+                select(
+                    Showtime.id, Showtime.cinema_id, Showtime.movie_id, Showtime.start_time,
+                    *[getattr(Showtime, a) for a in SHOWTIME_ATTRS],
+                )
+                .join(Cinema, Showtime.cinema_id == Cinema.id)
+                .where(Cinema.provider_id == self.provider_id, *in_scope)
+            )
+        }
+
+        # (showtime_id, url) -> id
+        self.links: Dict[Tuple, int] = {
+            (showtime_id, url): link_id
+            for link_id, showtime_id, url in db.execute(
+                select(BookingLink.id, BookingLink.showtime_id, BookingLink.url)
+                .join(Showtime, BookingLink.showtime_id == Showtime.id)
+                .join(Cinema, Showtime.cinema_id == Cinema.id)
+                .where(Cinema.provider_id == self.provider_id, *in_scope)
+            )
+        }
+
+    # ---------------------------------------------------
+    # PUBLIC
+    # ---------------------------------------------------
+    def add(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def add_all(self, rows: Iterable):
+        for row in rows:
+            self.add(row)
+
+    def keep_movie(self, external_id: str) -> bool:
+        """
+        Marks a movie and its showtimes, booking links and cinemas as seen
+        without reading its rows, for a movie whose content is unchanged
+        (see fingerprints.py). Returns False if the movie is not in the
+        database, in which case its rows must be added as usual.
+        """
+        movie_id = self.movie_ids.get(external_id)
+        if movie_id is None:
+            return False
+
+        if self._showtimes_by_movie is None:
+            self._showtimes_by_movie = {}
+            for key in self.showtimes:
+                self._showtimes_by_movie.setdefault(key[1], []).append(key)
+            self._links_by_showtime = {}
+            for key in self.links:
+                self._links_by_showtime.setdefault(key[0], []).append(key)
+            self._cinema_names = {i: ext for ext, i in self.cinema_ids.items()}
+
+        if external_id not in self.seen_movies:
+            self.seen_movies.add(external_id)
+            self.changes["movies"]["unchanged"] += 1
+
+        for key in self._showtimes_by_movie.get(movie_id, []):
+            if key in self.seen_showtimes:
+                continue
+            self.seen_showtimes.add(key)
+            self.changes["showtimes"]["unchanged"] += 1
+
+            name = self._cinema_names[key[0]]
+            if name not in self.seen_cinemas:
+                self.seen_cinemas.add(name)
+                self.changes["cinemas"]["unchanged"] += 1
+
+            for link in self._links_by_showtime.get(self.showtimes[key][0], []):
+                if link not in self.seen_links:
+                    self.seen_links.add(link)
+                    self.changes["booking_links"]["unchanged"] += 1
+
+        return True
+
+    def flush(self):
+        rows, self.pending = self.pending, []
+        if not rows:
+            return
+
+        self.counts["rows"] += len(rows)
+        with self.profiler.stage("flush movies"):
+            self._upsert_movies(rows)
+        with self.profiler.stage("flush cinemas"):
+            self._upsert_cinemas(rows)
+        with self.profiler.stage("flush showtimes"):
+            self._upsert_showtimes(rows)
+        with self.profiler.stage("flush booking_links"):
+            self._upsert_links(rows)
+
+    def finish(self) -> Counter:
+        """
+        Flushes, deletes rows the scrape no longer has, bumps the data
+        generation and commits the transaction.
+        """
+        self.flush()
+        with self.profiler.stage("delete unseen"):
+            self._delete_unseen()
+        # commits everything, and invalidates the API's response cache
+        with self.profiler.stage("commit"):
+            bump_generation(self.db)
+        return self.counts
+
+    def summary(self) -> str:
+        return "  ".join(
+            f"{table} +{c['inserted']} ~{c['updated']} -{c['deleted']} ={c['unchanged']}"
+            for table, c in self.changes.items()
+        )
+
+    # ---------------------------------------------------
+    # PER TABLE
+    # ---------------------------------------------------
+    def _upsert_movies(self, rows):
+        new = {}
+        for r in rows:
+            ext = r.movie_external_id
+            if ext in self.seen_movies:
+                continue
+            self.seen_movies.add(ext)
+            if ext in self.movie_ids:
+                self.changes["movies"]["unchanged"] += 1
+            else:
+                new[ext] = r.movie_title
+        if not new:
+            return
+
+        insert_ignore(self.db, Movie, [
+            {"provider_id": self.provider_id, "external_id": ext, "title": title}
+            for ext, title in new.items()
+        ], self.batch_size)
+
+        for chunk in _chunks(list(new), LOOKUP_CHUNK):
+            self.movie_ids.update(self.db.execute(
+                select(Movie.external_id, Movie.id).where(
+                    Movie.provider_id == self.provider_id,
+                    Movie.external_id.in_(chunk),
+                )
+            ).all())
+        self.changes["movies"]["inserted"] += len(new)
+
+    def _upsert_cinemas(self, rows):
+        new = set()
+        for r in rows:
+            name = r.cinema_name
+            if name in self.seen_cinemas:
+                continue
+            self.seen_cinemas.add(name)
+            if name in self.cinema_ids:
+                self.changes["cinemas"]["unchanged"] += 1
+            else:
+                new.add(name)
+        if not new:
+            return
+
+        insert_ignore(self.db, Cinema, [
+            {"provider_id": self.provider_id, "external_id": name, "name": name}
+            for name in new
+        ], self.batch_size)
+
+        for chunk in _chunks(list(new), LOOKUP_CHUNK):
+            self.cinema_ids.update(self.db.execute(
+                select(Cinema.external_id, Cinema.id).where(
+                    Cinema.provider_id == self.provider_id,
+                    Cinema.external_id.in_(chunk),
+                )
+            ).all())
+        self.changes["cinemas"]["inserted"] += len(new)
+
+    def _showtime_key(self, r) -> Tuple:
+        return (self.cinema_ids[r.cinema_name], self.movie_ids[r.movie_external_id], r.start_time)
+
+    def _upsert_showtimes(self, rows):
+        # first occurrence of a key wins, like create_showtime_if_not_exists
+        new, changed = {}, []
+        for r in rows:
+            key = self._showtime_key(r)
+            if key in self.seen_showtimes:
+                continue
+            self.seen_showtimes.add(key)
+
+            attrs = (r.version_label, r.hall_type, r.audio_language, r.subtitle_language)
+            existing = self.showtimes.get(key)
+            if existing is None:
+                new[key] = attrs
+            elif tuple(existing[1:]) != attrs:
+                changed.append({"id": existing[0], **dict(zip(SHOWTIME_ATTRS, attrs))})
+                self.showtimes[key] = (existing[0], *attrs)
+            else:
+                self.changes["showtimes"]["unchanged"] += 1
+
+        if changed:
+            # ORM bulk UPDATE by primary key (executemany)
+            self.db.execute(update(Showtime), changed)
+            self.changes["showtimes"]["updated"] += len(changed)
+
+        if not new:
+            return
+
+        insert_ignore(self.db, Showtime, [
+            {
+                "cinema_id": cinema_id,
+                "movie_id": movie_id,
+                "start_time": start_time,
+                **dict(zip(SHOWTIME_ATTRS, attrs)),
+            }
+            for (cinema_id, movie_id, start_time), attrs in new.items()
+        ], self.batch_size)
+
+        for chunk in _chunks(list(new), LOOKUP_CHUNK):
+            for showtime_id, cinema_id, movie_id, start_time in self.db.execute(
+                select(Showtime.id, Showtime.cinema_id, Showtime.movie_id, Showtime.start_time)
+                .where(tuple_(Showtime.cinema_id, Showtime.movie_id, Showtime.start_time).in_(chunk))
+            ):
+                key = (cinema_id, movie_id, start_time)
+                self.showtimes[key] = (showtime_id, *new[key])
+        self.changes["showtimes"]["inserted"] += len(new)
+
+    def _upsert_links(self, rows):
+        new = []
+        for r in rows:
+            if not r.booking_url:
+                continue
+            key = (self.showtimes[self._showtime_key(r)][0], r.booking_url)
+            if key in self.seen_links:
+                continue
+            self.seen_links.add(key)
+
+            if key in self.links:
+                self.changes["booking_links"]["unchanged"] += 1
+            else:
+                new.append({"showtime_id": key[0], "url": key[1]})
+        if not new:
+            return
+
+        insert_ignore(self.db, BookingLink, new, self.batch_size)
+        for row in new:
+            self.links[(row["showtime_id"], row["url"])] = None
+        self.changes["booking_links"]["inserted"] += len(new)
+
+    # ---------------------------------------------------
+    # DELETES
+    # ---------------------------------------------------
+    def _delete_unseen(self):
+        """
+        Children first: booking links, showtimes, then movies and cinemas
+        that nothing in the scrape mentions any more (full seeds only).
+        """
+        gone_showtimes = {
+            values[0]
+            for key, values in self.showtimes.items()
+            if key not in self.seen_showtimes
+        }
+
+        gone_links = [
+            link_id
+            for (showtime_id, url), link_id in self.links.items()
+            if link_id is not None
+            and ((showtime_id, url) not in self.seen_links or showtime_id in gone_showtimes)
+        ]
+        delete_ids(self.db, BookingLink, gone_links)
+        self.changes["booking_links"]["deleted"] += len(gone_links)
+
+        delete_ids(self.db, Showtime, sorted(gone_showtimes))
+        self.changes["showtimes"]["deleted"] += len(gone_showtimes)
+
+        if self.scope:
+            return
+
+        gone_movies = [i for ext, i in self.movie_ids.items() if ext not in self.seen_movies]
+        delete_ids(self.db, Movie, gone_movies)
+        self.changes["movies"]["deleted"] += len(gone_movies)
+
+        gone_cinemas = [i for ext, i in self.cinema_ids.items() if ext not in self.seen_cinemas]
+        delete_ids(self.db, Cinema, gone_cinemas)
+        self.changes["cinemas"]["deleted"] += len(gone_cinemas)
@@ -0,0 +1,92 @@
+# cache.py
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag: a digest of the exact response bytes.
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses the weak comparison
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def normalize_params(query_params) -> Tuple:
+    """
+    Order-independent cache key for a query string; empty values are dropped.
+    """
+    return tuple(sorted(
+        (k, v) for k, v in query_params.multi_items() if v != ""
+    ))
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized responses with a TTL.
+
+    Entries are tied to a data generation (see crud.bump_generation).
+    Seeing a newer generation drops everything cached for older ones,
+    so a seed or POST is visible on the next request.
+    Used from the event loop only, so there is no locking.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = None
+        self._entries = OrderedDict()
+
+    def _sync_generation(self, generation: int):
+        if generation != self.generation:
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, key, generation: int) -> Optional[Tuple[str, bytes]]:
+        self._sync_generation(generation)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, etag, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return etag, body
+
+    def put(self, key, generation: int, body: bytes) -> Tuple[str, bytes]:
+        self._sync_generation(generation)
+
+        etag = make_etag(body)
+        self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return etag, body
+
+    def clear(self):
+        self._entries.clear()
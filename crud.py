@@ -1,8 +1,11 @@
 # crud.py
-from sqlalchemy.orm import Session
-from models import Provider, Cinema, Movie, Showtime, BookingLink
-from datetime import datetime
-from typing import Optional, List
+import asyncio
+import time
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from models import Provider, Cinema, Movie, Showtime, BookingLink, DataGeneration
+from datetime import datetime, date
+from typing import Optional, List, Iterable
 
 # Providers
 def get_provider_by_name(db: Session, name: str):
@@ -83,3 +86,139 @@ def create_booking_link_if_not_exists(db: Session, showtime: Showtime, url: str)
     db.commit()
     db.refresh(bl)
     return bl
+
+
+# Data generation
+def bump_generation(db: Session):
+    """
+    Marks the data as changed. The value only moves forward, even across
+    a drop_all/create_all, because it is never lower than the clock. The
+    bump is one UPDATE computed from the stored value, so concurrent seeds
+    (--jobs) queue on the row instead of overwriting each other.
+    """
+    now = time.time_ns()
+    bumped = case((DataGeneration.value + 1 > now, DataGeneration.value + 1), else_=now)
+    result = db.execute(
+        update(DataGeneration).where(DataGeneration.id == 1).values(value=bumped),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount == 0:
+        db.add(DataGeneration(id=1, value=now))
+        db.flush()
+    value = db.scalar(select(DataGeneration.value).where(DataGeneration.id == 1))
+    db.commit()
+    return value
+
+
+# -------------------------------------------------------
+# READ QUERIES (statements; the caller pages and executes)
+# -------------------------------------------------------
+def cinemas_query(provider_id: Optional[int] = None):
+    stmt = select(Cinema)
+    if provider_id is not None:
+        stmt = stmt.where(Cinema.provider_id == provider_id)
+    return stmt
+
+
+def movies_query(movie_ids: Optional[Iterable[int]] = None, provider_id: Optional[int] = None):
+    """
+    `movie_ids` restricts to title-search hits (see search.py).
+    """
+    stmt = select(Movie)
+    if movie_ids is not None:
+        stmt = stmt.where(Movie.id.in_(list(movie_ids)))
+    if provider_id is not None:
+        stmt = stmt.where(Movie.provider_id == provider_id)
+    return stmt
+
+
+def filter_showtimes(
+    stmt,
+    movie_id: Optional[int] = None,
+    movie_ids: Optional[Iterable[int]] = None,
+    provider_id: Optional[int] = None,
+    cinema_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Applies the /showtimes filters to any statement over Showtime.
+    The provider filter expects `stmt` to already join Cinema, which
+    both read paths do for the response anyway.
+    """
+    if movie_id is not None:
+        stmt = stmt.where(Showtime.movie_id == movie_id)
+
+    if movie_ids is not None:
+        stmt = stmt.where(Showtime.movie_id.in_(list(movie_ids)))
+
+    if cinema_id is not None:
+        stmt = stmt.where(Showtime.cinema_id == cinema_id)
+
+    if provider_id is not None:
+        stmt = stmt.where(Cinema.provider_id == provider_id)
+
+    if start_date:
+        stmt = stmt.where(Showtime.start_time >= start_date)
+
+    if end_date:
+        stmt = stmt.where(Showtime.start_time <= end_date)
+
+    return stmt
+
+
+def showtimes_query(**filters):
+    """
+    ORM query for ShowtimeRead.
+
+    Cinema and provider are filled from the same inner joins the filters
+    use (contains_eager) and booking links come from one SELECT ... IN per
+    batch (selectinload), so the SQL returns exactly one row per showtime
+    and stays streamable with yield_per.
+    """
+    stmt = (
+        select(Showtime)
+        .join(Showtime.cinema)
+        .join(Cinema.provider)
+        .options(
+            contains_eager(Showtime.cinema).contains_eager(Cinema.provider),
+            selectinload(Showtime.booking_links),
+        )
+    )
+    return filter_showtimes(stmt, **filters)
+
+
+def booking_links_query():
+    return select(BookingLink)
+
+
+# -------------------------------------------------------
+# ASYNC READ HELPERS
+# Accept an AsyncSession, or a sync Session whose blocking
+# call is pushed to a worker thread.
+# -------------------------------------------------------
+async def fetch_all(db, stmt) -> list:
+    if isinstance(db, Session):
+        return await asyncio.to_thread(lambda: db.scalars(stmt).unique().all())
+    return (await db.scalars(stmt)).unique().all()
+
+
+async def fetch_rows(db, stmt) -> list:
+    if isinstance(db, Session):
+        return await asyncio.to_thread(lambda: db.execute(stmt).all())
+    return (await db.execute(stmt)).all()
+
+
+async def fetch_by_id(db, model, pk):
+    if isinstance(db, Session):
+        return await asyncio.to_thread(db.get, model, pk)
+    return await db.get(model, pk)
+
+
+async def fetch_generation(db) -> int:
+    stmt = select(DataGeneration.value).where(DataGeneration.id == 1)
+    if isinstance(db, Session):
+        value = await asyncio.to_thread(lambda: db.scalar(stmt))
+    else:
+        value = await db.scalar(stmt)
+    return value or 0
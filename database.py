@@ -1,6 +1,8 @@
 # database.py
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -8,6 +10,62 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+psycopg2://postgres:@localhost:5432/cinema_aggregator")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# async driver -> sync driver used by the seeder, POST handlers and create_all
+ASYNC_DRIVERS = {
+    "postgresql+asyncpg": "postgresql+psycopg2",
+    "sqlite+aiosqlite": "sqlite",
+}
+
+_url = make_url(DATABASE_URL)
+ASYNC_DB = _url.drivername in ASYNC_DRIVERS
+
+if ASYNC_DB:
+    SYNC_DATABASE_URL = _url.set(drivername=ASYNC_DRIVERS[_url.drivername])
+else:
+    SYNC_DATABASE_URL = _url
+
+engine = create_engine(SYNC_DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+def _file_identity(path):
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino)
+    except OSError:
+        return None
+
+
+def reconnect_on_file_swap(sync_engine, path):
+    """
+    The blue-green seeder (shadow_seed.py) replaces the SQLite file with
+    os.replace(). Open connections keep reading the old file, so pooled
+    connections are dropped on checkout once the path points elsewhere.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _remember_file(dbapi_connection, record):
+        record.info["file_identity"] = _file_identity(path)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _check_file(dbapi_connection, record, proxy):
+        if record.info.get("file_identity") != _file_identity(path):
+            raise DisconnectionError("database file was swapped")
+
+
+_sqlite_path = SYNC_DATABASE_URL.database if SYNC_DATABASE_URL.get_backend_name() == "sqlite" else None
+if _sqlite_path and _sqlite_path != ":memory:":
+    reconnect_on_file_swap(engine, _sqlite_path)
+
+# Optional async engine: only when DATABASE_URL names asyncpg or aiosqlite.
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    if _sqlite_path and _sqlite_path != ":memory:":
+        reconnect_on_file_swap(async_engine.sync_engine, _sqlite_path)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
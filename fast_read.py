@@ -0,0 +1,343 @@
+# fast_read.py
+"""
+Column-projected read path for /showtimes.
+
+Instead of hydrating Showtime/Cinema/Provider/BookingLink objects and
+validating them through ShowtimeRead(from_attributes=True), rows are
+selected as plain tuples and turned into dicts in the same key order
+as the schemas, then encoded with orjson. The bytes match
+schemas.ShowtimePage(...).model_dump_json().
+
+`compact=True` renders the same page dictionary-encoded: providers,
+cinemas and movies appear once in lookup tables and showtimes are
+column arrays referencing them by id.
+
+Sparse fieldsets (`fields=id,start_time,cinema.name`) prune the field
+trees below, so only the requested columns are selected, only the
+joins they need are made and booking links are only queried when asked for.
+"""
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import select
+
+import crud
+from models import Showtime, Cinema, Provider, Movie, BookingLink
+from pagination import keyset, page_of
+
+SHOWTIME_COLUMNS = (
+    Showtime.cinema_id,
+    Showtime.movie_id,
+    Showtime.start_time,
+    Showtime.version_label,
+    Showtime.hall_type,
+    Showtime.audio_language,
+    Showtime.subtitle_language,
+    Showtime.id,
+    Cinema.name,
+    Provider.id,
+    Provider.name,
+)
+
+
+def showtime_rows_query(**filters):
+    stmt = (
+        select(*SHOWTIME_COLUMNS)
+        .join(Cinema, Showtime.cinema_id == Cinema.id)
+        .join(Provider, Cinema.provider_id == Provider.id)
+    )
+    return crud.filter_showtimes(stmt, **filters)
+
+
+async def booking_links_by_showtime(db, showtime_ids) -> dict:
+    links = {}
+    if not showtime_ids:
+        return links
+
+    rows = await crud.fetch_rows(
+        db,
+        select(BookingLink.id, BookingLink.showtime_id, BookingLink.url)
+        .where(BookingLink.showtime_id.in_(showtime_ids))
+        .order_by(BookingLink.id),
+    )
+    for link_id, showtime_id, url in rows:
+        links.setdefault(showtime_id, []).append(
+            {"id": link_id, "showtime_id": showtime_id, "url": url}
+        )
+    return links
+
+
+async def showtimes_page(db, cursor: Optional[str], limit: int, compact: bool = False, **filters) -> bytes:
+    """
+    One keyset page of showtimes as JSON bytes: ShowtimePage, or the
+    compact layout. `limit` must already be clamped; InvalidCursor propagates.
+    """
+    stmt = keyset(showtime_rows_query(**filters), [Showtime.start_time, Showtime.id], cursor, limit)
+    rows, next_cursor = page_of(
+        await crud.fetch_rows(db, stmt),
+        limit,
+        lambda row: [row[2], row[7]],
+    )
+
+    links = await booking_links_by_showtime(db, [row[7] for row in rows])
+
+    if compact:
+        return await render_compact(db, rows, links, next_cursor)
+    return render_full(rows, links, next_cursor)
+
+
+def render_full(rows, links, next_cursor) -> bytes:
+    items = [
+        {
+            "cinema_id": cinema_id,
+            "movie_id": movie_id,
+            "start_time": start_time,
+            "version_label": version_label,
+            "hall_type": hall_type,
+            "audio_language": audio_language,
+            "subtitle_language": subtitle_language,
+            "id": showtime_id,
+            "cinema": {
+                "id": cinema_id,
+                "name": cinema_name,
+                "provider": {"id": provider_id, "name": provider_name},
+            },
+            "booking_links": links.get(showtime_id, []),
+        }
+        for (
+            cinema_id, movie_id, start_time, version_label, hall_type,
+            audio_language, subtitle_language, showtime_id,
+            cinema_name, provider_id, provider_name,
+        ) in rows
+    ]
+
+    return orjson.dumps({"items": items, "next_cursor": next_cursor})
+
+
+async def render_compact(db, rows, links, next_cursor) -> bytes:
+    """
+    {
+      "providers": [{"id", "name"}],
+      "cinemas":   [{"id", "name", "provider_id"}],
+      "movies":    [{"id", "title", "provider_id"}],
+      "showtimes": {"id": [...], "cinema_id": [...], "movie_id": [...],
+                    "start_time": [...], ..., "booking_links": [[url, ...], ...]},
+      "next_cursor": ...
+    }
+    """
+    providers, cinemas = {}, {}
+    columns = {
+        "id": [],
+        "cinema_id": [],
+        "movie_id": [],
+        "start_time": [],
+        "version_label": [],
+        "hall_type": [],
+        "audio_language": [],
+        "subtitle_language": [],
+        "booking_links": [],
+    }
+
+    for (
+        cinema_id, movie_id, start_time, version_label, hall_type,
+        audio_language, subtitle_language, showtime_id,
+        cinema_name, provider_id, provider_name,
+    ) in rows:
+        providers[provider_id] = provider_name
+        cinemas[cinema_id] = (cinema_name, provider_id)
+
+        columns["id"].append(showtime_id)
+        columns["cinema_id"].append(cinema_id)
+        columns["movie_id"].append(movie_id)
+        columns["start_time"].append(start_time)
+        columns["version_label"].append(version_label)
+        columns["hall_type"].append(hall_type)
+        columns["audio_language"].append(audio_language)
+        columns["subtitle_language"].append(subtitle_language)
+        columns["booking_links"].append([link["url"] for link in links.get(showtime_id, [])])
+
+    movie_ids = sorted(set(columns["movie_id"]))
+    movies = []
+    if movie_ids:
+        movies = await crud.fetch_rows(
+            db,
+            select(Movie.id, Movie.title, Movie.provider_id)
+            .where(Movie.id.in_(movie_ids))
+            .order_by(Movie.id),
+        )
+
+    return orjson.dumps({
+        "providers": [
+            {"id": i, "name": name}
+            for i, name in sorted(providers.items())
+        ],
+        "cinemas": [
+            {"id": i, "name": name, "provider_id": provider_id}
+            for i, (name, provider_id) in sorted(cinemas.items())
+        ],
+        "movies": [
+            {"id": i, "title": title, "provider_id": provider_id}
+            for i, title, provider_id in movies
+        ],
+        "showtimes": columns,
+        "next_cursor": next_cursor,
+    })
+
+
+# -------------------------------------------------------
+# SPARSE FIELDSETS
+# -------------------------------------------------------
+# Output name -> column, or a nested tree. Key order is the schema's.
+MOVIE_FIELDS = {
+    "core_movie_id": Movie.core_movie_id,
+    "provider_id": Movie.provider_id,
+    "external_id": Movie.external_id,
+    "title": Movie.title,
+    "id": Movie.id,
+}
+
+CINEMA_FIELDS = {
+    "provider_id": Cinema.provider_id,
+    "external_id": Cinema.external_id,
+    "name": Cinema.name,
+    "city": Cinema.city,
+    "country": Cinema.country,
+    "id": Cinema.id,
+}
+
+BOOKING_LINK_FIELDS = {
+    "id": BookingLink.id,
+    "showtime_id": BookingLink.showtime_id,
+    "url": BookingLink.url,
+}
+
+SHOWTIME_FIELDS = {
+    "cinema_id": Showtime.cinema_id,
+    "movie_id": Showtime.movie_id,
+    "start_time": Showtime.start_time,
+    "version_label": Showtime.version_label,
+    "hall_type": Showtime.hall_type,
+    "audio_language": Showtime.audio_language,
+    "subtitle_language": Showtime.subtitle_language,
+    "id": Showtime.id,
+    "cinema": {
+        "id": Cinema.id,
+        "name": Cinema.name,
+        "provider": {"id": Provider.id, "name": Provider.name},
+    },
+    # loaded by a separate query, only when selected
+    "booking_links": BOOKING_LINK_FIELDS,
+}
+
+
+class FieldError(ValueError):
+    pass
+
+
+def parse_fields(spec: str, tree: dict) -> dict:
+    """
+    Prunes `tree` to the comma-separated dotted paths in `spec`.
+    Naming a subtree ("cinema") keeps all of it.
+    """
+    paths = [p.strip().split(".") for p in spec.split(",") if p.strip()]
+    if not paths:
+        raise FieldError("fields is empty")
+
+    for path in paths:
+        node = tree
+        for part in path:
+            if not isinstance(node, dict) or part not in node:
+                raise FieldError(f"Unknown field: {'.'.join(path)}")
+            node = node[part]
+
+    return _prune(tree, paths)
+
+
+def _prune(tree: dict, paths: list) -> dict:
+    out = {}
+    for name, node in tree.items():
+        rest = [p[1:] for p in paths if p[0] == name]
+        if not rest:
+            continue
+        if not isinstance(node, dict) or any(not r for r in rest):
+            out[name] = node
+        else:
+            out[name] = _prune(node, rest)
+    return out
+
+
+def _compile(tree: dict, columns: list) -> list:
+    spec = []
+    for name, node in tree.items():
+        if isinstance(node, dict):
+            spec.append((name, _compile(node, columns)))
+        else:
+            columns.append(node)
+            spec.append((name, len(columns) - 1))
+    return spec
+
+
+def _render(spec: list, row) -> dict:
+    return {
+        name: _render(sub, row) if isinstance(sub, list) else row[sub]
+        for name, sub in spec
+    }
+
+
+async def sparse_page(db, stmt, tree: dict, order_by: List, cursor: Optional[str], limit: int) -> bytes:
+    """
+    Keyset page of `stmt` (a select over one model, filters applied)
+    projected to the columns in `tree`. Returns {items, next_cursor} bytes.
+    """
+    columns = []
+    spec = _compile(tree, columns)
+    keys = list(range(len(columns), len(columns) + len(order_by)))
+
+    stmt = keyset(stmt.with_only_columns(*columns, *order_by), order_by, cursor, limit)
+    rows, next_cursor = page_of(
+        await crud.fetch_rows(db, stmt),
+        limit,
+        lambda row: [row[k] for k in keys],
+    )
+    return orjson.dumps({"items": [_render(spec, row) for row in rows], "next_cursor": next_cursor})
+
+
+async def sparse_showtimes_page(db, tree: dict, cursor: Optional[str], limit: int, **filters) -> bytes:
+    """
+    /showtimes with a pruned SHOWTIME_FIELDS tree. Cinema and provider
+    are only joined when a selected field (or the provider filter)
+    needs them; booking links are only queried when selected.
+    """
+    tree = dict(tree)
+    links_tree = tree.pop("booking_links", None)
+
+    columns = []
+    spec = _compile(tree, columns)
+    order_by = [Showtime.start_time, Showtime.id]
+    keys = [len(columns), len(columns) + 1]
+
+    models_used = {c.class_ for c in columns}
+    stmt = select(*columns, *order_by).select_from(Showtime)
+    if Cinema in models_used or Provider in models_used or filters.get("provider_id") is not None:
+        stmt = stmt.join(Cinema, Showtime.cinema_id == Cinema.id)
+    if Provider in models_used:
+        stmt = stmt.join(Provider, Cinema.provider_id == Provider.id)
+
+    stmt = keyset(crud.filter_showtimes(stmt, **filters), order_by, cursor, limit)
+    rows, next_cursor = page_of(
+        await crud.fetch_rows(db, stmt),
+        limit,
+        lambda row: [row[k] for k in keys],
+    )
+
+    items = [_render(spec, row) for row in rows]
+
+    if links_tree is not None:
+        links = await booking_links_by_showtime(db, [row[keys[1]] for row in rows])
+        for item, row in zip(items, rows):
+            item["booking_links"] = [
+                {name: link[name] for name in links_tree}
+                for link in links.get(row[keys[1]], [])
+            ]
+
+    return orjson.dumps({"items": items, "next_cursor": next_cursor})
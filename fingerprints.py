@@ -0,0 +1,103 @@
+# fingerprints.py
+"""
+Content hashes that let the seeder skip unchanged provider data.
+
+A provider file is hashed as bytes ("file" scope); if it matches the
+last successful seed, the provider is skipped before anything is loaded.
+Otherwise each movie's records are hashed ("movie:<external_id>") and
+movies whose hash matches are kept as they are (BulkSeeder.keep_movie)
+instead of being re-diffed. Movie hashes are taken over the flat
+records of records.py, so a .json and an .ndjson of the same scrape
+hash the same.
+
+The refresh scheduler (scheduler.py) keeps one hash per slice of a
+provider ("slice:<key>"). Writing a slice changes the provider's data
+without a file, so it drops the file and movie hashes.
+"""
+import hashlib
+import json
+from typing import Dict, Optional
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+
+from models import Provider, SeedFingerprint
+from records import RECORD_FIELDS
+
+FILE_SCOPE = "file"
+MOVIE_SCOPE = "movie:"
+SLICE_SCOPE = "slice:"
+
+_READ_CHUNK = 1 << 20
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def file_digest(path: str) -> str:
+    h = new_hash()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def update_record(h, record: dict):
+    """Feeds one flat record into `h`, independent of key order and spacing."""
+    h.update(json.dumps([record.get(f) for f in RECORD_FIELDS], ensure_ascii=False).encode())
+    h.update(b"\n")
+
+
+def movie_scope(external_id: str) -> str:
+    return MOVIE_SCOPE + external_id
+
+
+def slice_scope(key: str) -> str:
+    return SLICE_SCOPE + key
+
+
+# -------------------------------------------------------
+# STORAGE
+# -------------------------------------------------------
+def load(db: Session, provider_name: str) -> Dict[str, str]:
+    """scope -> digest from the provider's last successful seed."""
+    return dict(db.execute(
+        select(SeedFingerprint.scope, SeedFingerprint.digest)
+        .join(Provider, SeedFingerprint.provider_id == Provider.id)
+        .where(Provider.name == provider_name)
+    ).all())
+
+
+def save(db: Session, provider_id: int, digests: Dict[str, str]):
+    """
+    Replaces the provider's fingerprints. Does not commit: they belong
+    to the seed's transaction, so a failed seed leaves the old ones.
+    """
+    clear(db, provider_id)
+    if digests:
+        db.execute(SeedFingerprint.__table__.insert(), [
+            {"provider_id": provider_id, "scope": scope, "digest": digest}
+            for scope, digest in digests.items()
+        ])
+
+
+def clear(db: Session, provider_id: int):
+    db.execute(delete(SeedFingerprint).where(SeedFingerprint.provider_id == provider_id))
+
+
+def save_slice(db: Session, provider_id: int, key: str, digest: Optional[str]):
+    """
+    Records one slice's hash (None removes it), in the slice's
+    transaction. The file and movie hashes no longer describe the
+    database, so they are dropped.
+    """
+    scope = slice_scope(key)
+    db.execute(delete(SeedFingerprint).where(
+        SeedFingerprint.provider_id == provider_id,
+        or_(~SeedFingerprint.scope.startswith(SLICE_SCOPE), SeedFingerprint.scope == scope),
+    ))
+    if digest is not None:
+        db.execute(SeedFingerprint.__table__.insert(), [
+            {"provider_id": provider_id, "scope": scope, "digest": digest}
+        ])
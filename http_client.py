@@ -0,0 +1,280 @@
+# http_client.py
+"""
+HTTP plumbing for the API-based scrapers: a pooled keep-alive
+requests.Session with retries and backoff, a token bucket that caps the
+request rate across all worker threads, and an on-disk response cache
+that revalidates with ETag / Last-Modified and honours freshness headers.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and bursts of up to
+    `burst`. acquire() blocks until a token is free; safe across threads.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(headers: Optional[dict] = None, pool_size: int = 10, retries: int = 3,
+                 backoff: float = 0.5) -> requests.Session:
+    """
+    Session whose connection pool holds `pool_size` keep-alive connections
+    per host. GETs are retried on connection errors and RETRY_STATUSES
+    with exponential backoff (honouring Retry-After).
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+# -------------------------------------------------------
+# ON-DISK RESPONSE CACHE
+# -------------------------------------------------------
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def fresh_until(headers, now: float) -> Optional[float]:
+    """
+    Until when a response may be reused without asking the server, from
+    Cache-Control max-age (minus Age) or Expires. `now` when it must be
+    revalidated every time; None when it must not be stored at all.
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return now
+
+    m = _MAX_AGE_RE.search(cache_control)
+    if m:
+        try:
+            age = float(headers.get("Age", 0))
+        except ValueError:
+            age = 0.0
+        return now + int(m.group(1)) - age
+
+    expires = _http_date(headers.get("Expires"))
+    if expires is not None:
+        date = _http_date(headers.get("Date")) or now
+        return now + (expires - date)
+    return now
+
+
+class HttpCache:
+    """
+    Stores each GET's body and validators under `directory`, keyed by a
+    hash of the full URL. Callers may also keep data derived from a body
+    (e.g. its normalized records) next to it with save_derived(); it is
+    tagged with the body's digest and ignored once the body changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _write(self, path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def meta(self, key: str) -> Optional[dict]:
+        raw = self._read(self._path(key, "meta"))
+        return json.loads(raw) if raw else None
+
+    def body(self, key: str) -> Optional[bytes]:
+        return self._read(self._path(key, "body"))
+
+    def drop(self, key: str):
+        for suffix in ("meta", "body"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def store(self, key: str, meta: dict, body: Optional[bytes] = None):
+        if body is not None:
+            self._write(self._path(key, "body"), body)
+        self._write(self._path(key, "meta"), json.dumps(meta).encode())
+
+    def load_derived(self, response: "CachedResponse", name: str):
+        """What save_derived() stored for this exact body, else None."""
+        raw = self._read(self._path(response.key, name))
+        if not raw:
+            return None
+        saved = json.loads(raw)
+        return saved["value"] if saved.get("digest") == response.digest else None
+
+    def save_derived(self, response: "CachedResponse", name: str, value):
+        self._write(
+            self._path(response.key, name),
+            json.dumps({"digest": response.digest, "value": value}, ensure_ascii=False).encode(),
+        )
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+
+class CachedResponse:
+    """
+    `unchanged` is True when the body is the one already cached: still
+    fresh, answered 304, or re-sent with identical bytes.
+    """
+
+    def __init__(self, body: bytes, unchanged: bool, key: Optional[str], outcome: str,
+                 digest: Optional[str] = None):
+        self.body = body
+        self.unchanged = unchanged
+        self.key = key
+        self.outcome = outcome
+        self.digest = digest
+        self._payload = None
+
+    def json(self) -> Any:
+        if self._payload is None:
+            self._payload = json.loads(self.body)
+        return self._payload
+
+
+def get_cached(session: requests.Session, bucket: Optional[TokenBucket], cache: Optional[HttpCache],
+               url: str, params: Optional[dict] = None, timeout: float = 10) -> CachedResponse:
+    """
+    GET through `cache`: a fresh entry is returned without a request,
+    a stale one is revalidated with If-None-Match / If-Modified-Since.
+    Without a cache this is a plain GET.
+    """
+    full_url = requests.Request("GET", url, params=params).prepare().url
+    key = HttpCache.key(full_url) if cache else None
+    meta = cache.meta(key) if cache else None
+    now = time.time()
+
+    if meta and meta.get("fresh_until", 0) > now:
+        body = cache.body(key)
+        if body is not None:
+            cache.count("fresh")
+            return CachedResponse(body, True, key, "fresh", meta.get("digest"))
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    if bucket:
+        bucket.acquire()
+    r = session.get(full_url, headers=headers, timeout=timeout)
+
+    if r.status_code == 304:
+        body = cache.body(key) if meta else None
+        if body is not None:
+            until = fresh_until(r.headers, time.time())
+            if until is not None:
+                meta["fresh_until"] = until
+                cache.store(key, meta)
+            cache.count("not_modified")
+            return CachedResponse(body, True, key, "not_modified", meta.get("digest"))
+
+        # validators whose body is gone: forget them and ask for the page
+        if cache:
+            cache.drop(key)
+            cache.count("body_missing")
+        meta = None
+        if bucket:
+            bucket.acquire()
+        r = session.get(full_url, timeout=timeout)
+        if r.status_code == 304:
+            raise requests.HTTPError(f"304 Not Modified for an uncached page: {full_url}", response=r)
+
+    r.raise_for_status()
+    body = r.content
+    if not cache:
+        return CachedResponse(body, False, None, "downloaded")
+
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    unchanged = bool(meta) and meta.get("digest") == digest
+    until = fresh_until(r.headers, time.time())
+    if until is not None:
+        cache.store(key, {
+            "url": full_url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "fresh_until": until,
+            "digest": digest,
+        }, body)
+
+    outcome = "same_body" if unchanged else "downloaded"
+    cache.count(outcome)
+    return CachedResponse(body, unchanged, key, outcome, digest)
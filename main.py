@@ -1,12 +1,16 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Literal, Optional
 from datetime import date
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
-from database import SessionLocal, engine, Base
-import models, schemas, crud
+from database import SessionLocal, AsyncSessionLocal, engine, Base
+import models, schemas, crud, search, fast_read
+from pagination import InvalidCursor, clamp_limit, keyset, page_of
+from cache import ResponseCache, etag_matches, normalize_params
 
 # --------------------------------------------------
 # INIT
@@ -37,12 +41,136 @@ def get_db():
         db.close()
 
 
+def fields_tree(fields: Optional[str], tree: dict):
+    if fields is None:
+        return None
+    try:
+        return fast_read.parse_fields(fields, tree)
+    except fast_read.FieldError as e:
+        raise HTTPException(400, str(e))
+
+
+async def get_read_db():
+    """
+    Session for the read endpoints: an AsyncSession when DATABASE_URL
+    names an async driver (asyncpg / aiosqlite), otherwise a sync
+    Session that crud's async helpers drive from a worker thread.
+    """
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+# --------------------------------------------------
+# PAGINATION
+# --------------------------------------------------
+async def fetch_page(db, stmt, columns, cursor: Optional[str], limit: Optional[int]):
+    """
+    Runs `stmt` as one keyset page ordered by `columns`.
+    Returns (items, next_cursor).
+    """
+    limit = clamp_limit(limit)
+    try:
+        stmt = keyset(stmt, columns, cursor, limit)
+    except InvalidCursor:
+        raise HTTPException(400, "Invalid cursor")
+
+    rows = await crud.fetch_all(db, stmt)
+    return page_of(
+        rows,
+        limit,
+        lambda row: [getattr(row, c.key) for c in columns],
+    )
+
+
+# --------------------------------------------------
+# RESPONSE CACHE
+# --------------------------------------------------
+response_cache = ResponseCache()
+
+
+async def sparse_page(db, stmt, tree: dict, order_by, cursor: Optional[str], limit: Optional[int]) -> bytes:
+    try:
+        return await fast_read.sparse_page(db, stmt, tree, order_by, cursor, clamp_limit(limit))
+    except InvalidCursor:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def dump_json(schema, payload) -> bytes:
+    return schema.model_validate(payload, from_attributes=True).model_dump_json().encode()
+
+
+async def cached_json(request: Request, db, build):
+    """
+    Serves JSON bytes from the response cache, awaiting `build()` on a
+    miss. Entries die when the data generation moves. Every response
+    carries a strong ETag and If-None-Match gets a 304.
+    """
+    generation = await crud.fetch_generation(db)
+    key = (request.url.path, normalize_params(request.query_params))
+
+    hit = response_cache.get(key, generation)
+    if hit is None:
+        hit = response_cache.put(key, generation, await build())
+
+    etag, body = hit
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+# --------------------------------------------------
+# NDJSON STREAMING (bulk export)
+# --------------------------------------------------
+NDJSON = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+def stream_ndjson(stmt, schema):
+    """
+    Streams every row of `stmt` as one JSON object per line.
+
+    Rows are read in chunks through a server-side cursor (yield_per)
+    and serialized one at a time, so memory stays flat however large
+    the export is. The stream owns its session because it outlives
+    the request's dependencies.
+    """
+    stmt = stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)
+
+    def lines():
+        db = SessionLocal()
+        try:
+            for obj in db.scalars(stmt):
+                yield schema.model_validate(obj).model_dump_json().encode() + b"\n"
+        finally:
+            db.close()
+
+    async def async_lines():
+        async with AsyncSessionLocal() as db:
+            async for obj in await db.stream_scalars(stmt):
+                yield schema.model_validate(obj).model_dump_json().encode() + b"\n"
+
+    if AsyncSessionLocal is None:
+        return StreamingResponse(lines(), media_type=NDJSON)
+    return StreamingResponse(async_lines(), media_type=NDJSON)
+
+
 # --------------------------------------------------
 # PROVIDERS
 # --------------------------------------------------
 @app.get("/providers", response_model=List[schemas.ProviderRead])
-def list_providers(db: Session = Depends(get_db)):
-    return db.query(models.Provider).all()
+async def list_providers(db=Depends(get_read_db)):
+    return await crud.fetch_all(db, select(models.Provider).order_by(models.Provider.id))
 
 
 @app.post("/providers", response_model=schemas.ProviderRead)
@@ -50,27 +178,44 @@ def create_provider(
     provider: schemas.ProviderBase,
     db: Session = Depends(get_db)
 ):
-    return crud.create_provider_if_not_exists(
+    p = crud.create_provider_if_not_exists(
         db,
         provider.name,
         provider.website_url
     )
+    crud.bump_generation(db)
+    return p
 
 
 # --------------------------------------------------
 # CINEMAS
 # --------------------------------------------------
-@app.get("/cinemas", response_model=List[schemas.CinemaRead])
-def list_cinemas(
+@app.get("/cinemas", response_model=schemas.CinemaPage)
+async def list_cinemas(
+    request: Request,
     provider_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, description="Page size (server-capped)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name"),
+    db=Depends(get_read_db)
 ):
-    q = db.query(models.Cinema)
+    tree = fields_tree(fields, fast_read.CINEMA_FIELDS)
+
+    async def build():
+        stmt = crud.cinemas_query(provider_id=provider_id)
+        if tree is not None:
+            return await sparse_page(db, stmt, tree, [models.Cinema.id], cursor, limit)
 
-    if provider_id is not None:
-        q = q.filter(models.Cinema.provider_id == provider_id)
+        items, next_cursor = await fetch_page(
+            db,
+            stmt,
+            [models.Cinema.id],
+            cursor,
+            limit,
+        )
+        return dump_json(schemas.CinemaPage, {"items": items, "next_cursor": next_cursor})
 
-    return q.all()
+    return await cached_json(request, db, build)
 
 
 @app.post("/cinemas", response_model=schemas.CinemaRead)
@@ -82,7 +227,7 @@ def create_cinema(
     if not provider:
         raise HTTPException(404, "Provider not found")
 
-    return crud.get_or_create_cinema(
+    c = crud.get_or_create_cinema(
         db,
         provider,
         external_id=cinema.external_id,
@@ -90,34 +235,74 @@ def create_cinema(
         city=cinema.city,
         country=cinema.country,
     )
+    crud.bump_generation(db)
+    return c
 
 
 # --------------------------------------------------
 # MOVIES
 # --------------------------------------------------
-@app.get("/movies", response_model=List[schemas.MovieRead])
-def list_movies(
+@app.get("/movies", response_model=schemas.MoviePage)
+async def list_movies(
+    request: Request,
     title: Optional[str] = Query(None, description="Search by movie title"),
     provider_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, description="Page size (server-capped)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name"),
+    db=Depends(get_read_db)
 ):
-    q = db.query(models.Movie)
+    tree = fields_tree(fields, fast_read.MOVIE_FIELDS)
+
+    async def build():
+        movie_ids = None
+        if title:
+            movie_ids = (await search.title_index(db)).contains(title, provider_id)
+
+        stmt = crud.movies_query(movie_ids=movie_ids, provider_id=provider_id)
+        if tree is not None:
+            return await sparse_page(db, stmt, tree, [models.Movie.id], cursor, limit)
+
+        items, next_cursor = await fetch_page(
+            db,
+            stmt,
+            [models.Movie.id],
+            cursor,
+            limit,
+        )
+        return dump_json(schemas.MoviePage, {"items": items, "next_cursor": next_cursor})
 
-    if title:
-        q = q.filter(models.Movie.title.ilike(f"%{title}%"))
+    return await cached_json(request, db, build)
 
-    if provider_id is not None:
-        q = q.filter(models.Movie.provider_id == provider_id)
 
-    return q.all()
+@app.get("/movies/search", response_model=List[schemas.MovieMatch])
+async def search_movies(
+    q: str = Query(..., min_length=1, description="Title, typos and transliterations welcome"),
+    provider_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db=Depends(get_read_db)
+):
+    hits = (await search.title_index(db)).search(q, limit=limit, provider_id=provider_id)
+    if not hits:
+        return []
+
+    movies = {
+        m.id: m
+        for m in await crud.fetch_all(db, crud.movies_query(movie_ids=[i for i, _ in hits]))
+    }
+    return [
+        {**schemas.MovieRead.model_validate(movies[i]).model_dump(), "score": score}
+        for i, score in hits
+        if i in movies
+    ]
 
 
 @app.get("/movies/{movie_id}", response_model=schemas.MovieRead)
-def get_movie_by_id(
+async def get_movie_by_id(
     movie_id: int,
-    db: Session = Depends(get_db)
+    db=Depends(get_read_db)
 ):
-    movie = db.query(models.Movie).get(movie_id)
+    movie = await crud.fetch_by_id(db, models.Movie, movie_id)
     if not movie:
         raise HTTPException(404, "Movie not found")
     return movie
@@ -132,53 +317,100 @@ def create_movie(
     if not provider:
         raise HTTPException(404, "Provider not found")
 
-    return crud.get_or_create_movie(
+    m = crud.get_or_create_movie(
         db,
         provider,
         external_id=movie.external_id,
         title=movie.title,
         core_movie_id=movie.core_movie_id,
     )
+    crud.bump_generation(db)
+    return m
 
 
 # --------------------------------------------------
 # SHOWTIMES
 # --------------------------------------------------
-@app.get("/showtimes", response_model=List[schemas.ShowtimeRead])
-def list_showtimes(
+@app.get("/showtimes", response_model=schemas.ShowtimePage)
+async def list_showtimes(
+    request: Request,
     movie_id: Optional[int] = None,
     movie_title: Optional[str] = None,
     provider_id: Optional[int] = None,
     cinema_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, description="Page size (server-capped)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every match as NDJSON"),
+    format: Literal["full", "compact"] = Query(
+        "full",
+        description="compact: cinema/provider/movie lookup tables plus showtime column arrays",
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, e.g. id,start_time,cinema.name",
+    ),
+    db=Depends(get_read_db)
 ):
-    q = db.query(models.Showtime).options(
-        joinedload(models.Showtime.movie),
-        joinedload(models.Showtime.cinema).joinedload(models.Cinema.provider),
-        joinedload(models.Showtime.booking_links),
+    tree = fields_tree(fields, fast_read.SHOWTIME_FIELDS)
+    if tree is not None and format == "compact":
+        raise HTTPException(400, "fields cannot be combined with format=compact")
+
+    async def filters():
+        movie_ids = None
+        if movie_title:
+            movie_ids = (await search.title_index(db)).contains(movie_title)
+
+        return dict(
+            movie_id=movie_id,
+            movie_ids=movie_ids,
+            provider_id=provider_id,
+            cinema_id=cinema_id,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+    if wants_stream(request, stream):
+        return stream_ndjson(
+            crud.showtimes_query(**await filters()).order_by(
+                models.Showtime.start_time, models.Showtime.id
+            ),
+            schemas.ShowtimeRead,
+        )
+
+    async def build():
+        try:
+            if tree is not None:
+                return await fast_read.sparse_showtimes_page(
+                    db, tree, cursor, clamp_limit(limit), **await filters()
+                )
+            return await fast_read.showtimes_page(
+                db,
+                cursor,
+                clamp_limit(limit),
+                compact=format == "compact",
+                **await filters(),
+            )
+        except InvalidCursor:
+            raise HTTPException(400, "Invalid cursor")
+
+    return await cached_json(request, db, build)
+
+
+async def showtimes_page_orm(db, cursor: Optional[str], limit: Optional[int], **filters) -> bytes:
+    """
+    Reference ORM + Pydantic rendering of a /showtimes page. The API
+    serves fast_read.showtimes_page; benchmark.py compares the two.
+    """
+    items, next_cursor = await fetch_page(
+        db,
+        crud.showtimes_query(**filters),
+        [models.Showtime.start_time, models.Showtime.id],
+        cursor,
+        limit,
     )
-
-    if movie_id is not None:
-        q = q.filter(models.Showtime.movie_id == movie_id)
-
-    if movie_title:
-        q = q.join(models.Movie).filter(models.Movie.title.ilike(f"%{movie_title}%"))
-
-    if cinema_id is not None:
-        q = q.filter(models.Showtime.cinema_id == cinema_id)
-
-    if provider_id is not None:
-        q = q.join(models.Cinema).filter(models.Cinema.provider_id == provider_id)
-
-    if start_date:
-        q = q.filter(models.Showtime.start_time >= start_date)
-
-    if end_date:
-        q = q.filter(models.Showtime.start_time <= end_date)
-
-    return q.all()
+    return dump_json(schemas.ShowtimePage, {"items": items, "next_cursor": next_cursor})
 
 
 @app.post("/showtimes", response_model=schemas.ShowtimeRead)
@@ -203,6 +435,7 @@ def create_showtime(
         subtitle_language=show.subtitle_language,
     )
 
+    crud.bump_generation(db)
     db.refresh(showtime)
     return showtime
 
@@ -210,6 +443,25 @@ def create_showtime(
 # --------------------------------------------------
 # BOOKING LINKS
 # --------------------------------------------------
-@app.get("/booking-links", response_model=List[schemas.BookingLinkRead])
-def list_booking_links(db: Session = Depends(get_db)):
-    return db.query(models.BookingLink).all()
+@app.get("/booking-links", response_model=schemas.BookingLinkPage)
+async def list_booking_links(
+    request: Request,
+    limit: Optional[int] = Query(None, description="Page size (server-capped)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    stream: bool = Query(False, description="Stream every link as NDJSON"),
+    db=Depends(get_read_db)
+):
+    if wants_stream(request, stream):
+        return stream_ndjson(
+            crud.booking_links_query().order_by(models.BookingLink.id),
+            schemas.BookingLinkRead,
+        )
+
+    items, next_cursor = await fetch_page(
+        db,
+        crud.booking_links_query(),
+        [models.BookingLink.id],
+        cursor,
+        limit,
+    )
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -46,7 +46,11 @@ class Movie(Base):
     provider = relationship("Provider", back_populates="movies")
     showtimes = relationship("Showtime", back_populates="movie")
 
-    __table_args__ = (UniqueConstraint("core_movie_id", "provider_id"),)
+    __table_args__ = (
+        UniqueConstraint("core_movie_id", "provider_id"),
+        # natural key used by the seeder
+        UniqueConstraint("provider_id", "external_id"),
+    )
 
 
 class Showtime(Base):
@@ -66,7 +70,11 @@ class Showtime(Base):
     movie = relationship("Movie", back_populates="showtimes")
     booking_links = relationship("BookingLink", back_populates="showtime")
 
-    __table_args__ = (UniqueConstraint("cinema_id", "movie_id", "start_time"),)
+    __table_args__ = (
+        UniqueConstraint("cinema_id", "movie_id", "start_time"),
+        # keyset pagination order for /showtimes
+        Index("ix_showtimes_start_time_id", "start_time", "id"),
+    )
 
 
 class BookingLink(Base):
@@ -77,3 +85,31 @@ class BookingLink(Base):
     url = Column(String(255), nullable=False)
 
     showtime = relationship("Showtime", back_populates="booking_links")
+
+    __table_args__ = (UniqueConstraint("showtime_id", "url"),)
+
+
+class DataGeneration(Base):
+    """
+    Single-row counter bumped whenever showtime data changes
+    (seeding, POSTs). The API keys its response cache on it.
+    """
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False)
+
+
+class SeedFingerprint(Base):
+    """
+    Content hash of a seeded provider file ("file") and of each movie's
+    records in it ("movie:<external_id>"), written with the seed.
+    """
+    __tablename__ = "seed_fingerprints"
+
+    id = Column(Integer, primary_key=True)
+    provider_id = Column(Integer, ForeignKey("providers.id"), nullable=False)
+    scope = Column(String(150), nullable=False)
+    digest = Column(String(32), nullable=False)
+
+    __table_args__ = (UniqueConstraint("provider_id", "scope"),)
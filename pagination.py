@@ -0,0 +1,91 @@
+# pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """
+    The server always caps the page size, whatever the client asks for.
+    """
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+# -------------------------------------------------------
+# OPAQUE CURSORS
+# -------------------------------------------------------
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kinds: Sequence[type]) -> Tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise InvalidCursor(cursor)
+
+        out = []
+        for kind, v in zip(kinds, values):
+            if kind is datetime:
+                out.append(datetime.fromisoformat(v))
+            elif kind is int and isinstance(v, int) and not isinstance(v, bool):
+                out.append(v)
+            else:
+                raise InvalidCursor(cursor)
+        return tuple(out)
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+# -------------------------------------------------------
+# KEYSET PAGES
+# -------------------------------------------------------
+def keyset(stmt, columns, cursor: Optional[str], limit: int):
+    """
+    Orders `stmt` by `columns` and seeks past `cursor`.
+
+    One extra row is fetched so `page_of` can tell whether
+    another page follows without a COUNT(*).
+    """
+    if cursor:
+        kinds = [
+            datetime if c.type.python_type is datetime else int
+            for c in columns
+        ]
+        after = decode_cursor(cursor, kinds)
+        if len(columns) == 1:
+            stmt = stmt.where(columns[0] > after[0])
+        else:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*after))
+
+    return stmt.order_by(*columns).limit(limit + 1)
+
+
+def page_of(rows: list, limit: int, key):
+    """
+    Returns (items, next_cursor). `key(row)` gives the row's sort values.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    return items, encode_cursor(key(items[-1]))
@@ -0,0 +1,210 @@
+# python_run_all.py
+"""
+One refresh of every provider: the scrapers run at the same time, and
+each provider is seeded as soon as its own scraper finishes.
+
+    python python_run_all.py
+    python python_run_all.py --only major --only prime --timeout prime=120
+    python python_run_all.py --no-seed
+
+Every scraper runs in its own process (python -m scraper.<name>), so a
+browser that crashes or hangs cannot take the others down. A scraper
+that exceeds its timeout is killed together with its browser, and its
+.ndjson file is left without an end-of-file marker. A provider is only
+seeded if its scraper exited cleanly, so it keeps its current data
+otherwise.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, NamedTuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class ScraperJob(NamedTuple):
+    name: str  # file stem: <name>.ndjson
+    provider_name: str
+    module: str
+    timeout: float  # seconds
+
+
+JOBS = [
+    ScraperJob("legend", "Legend Cinema", "scraper.legend_scraper", 900),
+    ScraperJob("major", "Major Cineplex", "scraper.major_scraper", 300),
+    ScraperJob("prime", "Prime Cineplex", "scraper.prime_scraper", 300),
+]
+
+# seconds between SIGTERM and SIGKILL for a scraper that timed out
+KILL_GRACE = 5
+
+
+# -------------------------------------------------------
+# SCRAPER PROCESSES
+# -------------------------------------------------------
+def _pipe_output(proc, name):
+    for line in proc.stdout:
+        print(f"[{name}] {line.rstrip()}", flush=True)
+
+
+def _kill(proc):
+    """Stops the scraper and every browser process it started."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def run_scraper(job: ScraperJob, timeout: float) -> str:
+    """Runs one scraper to completion; returns "ok", "timeout" or "exit <code>"."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", job.module, "--sink", "ndjson"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        # own process group, so a timeout also kills the browser
+        start_new_session=True,
+    )
+    reader = threading.Thread(target=_pipe_output, args=(proc, job.name), daemon=True)
+    reader.start()
+
+    try:
+        code = proc.wait(timeout)
+        status = "ok" if code == 0 else f"exit {code}"
+    except subprocess.TimeoutExpired:
+        print(f"⏰ {job.provider_name}: no result after {timeout:g}s, stopping it")
+        _kill(proc)
+        status = "timeout"
+    reader.join(KILL_GRACE)
+    return status
+
+
+# -------------------------------------------------------
+# REFRESH
+# -------------------------------------------------------
+class Result(NamedTuple):
+    provider_name: str
+    scrape_seconds: float
+    scrape_status: str
+    seed_seconds: float
+    seed_status: str
+
+    @property
+    def ok(self) -> bool:
+        return self.scrape_status == "ok" and self.seed_status in ("seeded", "unchanged", "-")
+
+
+def refresh(jobs: List[ScraperJob], timeouts: dict, seed: bool = True,
+            use_fingerprints: bool = True) -> List[Result]:
+    """Scrapes every job concurrently; returns one Result per job, in job order."""
+    if seed:
+        # the seeder's imports open the database; --no-seed does not need them
+        from database import Base, SessionLocal, engine
+        from records import IncompleteRecords
+        from seed_from_json import prepare_providers, seed_file
+
+        Base.metadata.create_all(bind=engine)
+        prepare_providers(SessionLocal, [job.provider_name for job in jobs])
+        # SQLite allows one writer at a time
+        seed_lock = threading.Lock() if engine.dialect.name == "sqlite" else nullcontext()
+
+    def run(job: ScraperJob) -> Result:
+        started = time.perf_counter()
+        scrape_status = run_scraper(job, timeouts.get(job.name, job.timeout))
+        scrape_seconds = time.perf_counter() - started
+
+        seed_seconds, seed_status = 0.0, "-"
+        if seed and scrape_status != "ok":
+            seed_status = "not seeded"
+            print(f"⚠️ {job.provider_name}: scraper {scrape_status}, keeping its current data")
+        elif seed:
+            started = time.perf_counter()
+            try:
+                with seed_lock:
+                    changes = seed_file(os.path.join(ROOT, f"{job.name}.ndjson"), job.provider_name,
+                                        use_fingerprints=use_fingerprints)
+                seed_status = "unchanged" if changes is None else "seeded"
+            except IncompleteRecords as e:
+                seed_status = "skipped (incomplete)"
+                print(f"⚠️ Skipping {job.provider_name}: {e}")
+            except Exception as e:
+                seed_status = "seed failed"
+                print(f"❌ Seeding {job.provider_name} failed: {e}")
+            seed_seconds = time.perf_counter() - started
+
+        return Result(job.provider_name, scrape_seconds, scrape_status, seed_seconds, seed_status)
+
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="run_all") as pool:
+        return list(pool.map(run, jobs))
+
+
+def report(results: List[Result], wall: float) -> str:
+    lines = [
+        "⏱️ Refresh",
+        f"   {'provider':<16} {'scrape':>8} {'':<12} {'seed':>8} {'':<12} {'total':>8}",
+    ]
+    for r in results:
+        lines.append(
+            f"   {r.provider_name:<16} {r.scrape_seconds:>7.1f}s {r.scrape_status:<12} "
+            f"{r.seed_seconds:>7.1f}s {r.seed_status:<12} {r.scrape_seconds + r.seed_seconds:>7.1f}s"
+        )
+    one_by_one = sum(r.scrape_seconds + r.seed_seconds for r in results)
+    lines.append(f"   wall clock {wall:.1f}s (one after another: {one_by_one:.1f}s)")
+    return "\n".join(lines)
+
+
+def parse_timeouts(values: List[str]) -> dict:
+    timeouts = {}
+    for value in values or []:
+        name, _, seconds = value.partition("=")
+        timeouts[name] = float(seconds)
+    return timeouts
+
+
+if __name__ == "__main__":
+    names = [job.name for job in JOBS]
+    parser = argparse.ArgumentParser(description="Scrape every provider concurrently and seed each as it finishes")
+    parser.add_argument("--only", action="append", choices=names, help="run only these scrapers (repeatable)")
+    parser.add_argument("--timeout", action="append", metavar="NAME=SECONDS",
+                        help="per-scraper timeout, e.g. legend=600 (repeatable)")
+    parser.add_argument("--no-seed", action="store_true", help="only scrape, leave the database alone")
+    parser.add_argument("--no-fingerprints", action="store_true",
+                        help="re-read every movie even if its content hash is unchanged")
+    args = parser.parse_args()
+
+    try:
+        timeouts = parse_timeouts(args.timeout)
+    except ValueError:
+        parser.error("--timeout takes NAME=SECONDS, e.g. legend=600")
+    unknown = set(timeouts) - set(names)
+    if unknown:
+        parser.error(f"unknown scraper in --timeout: {', '.join(sorted(unknown))}")
+
+    jobs = [job for job in JOBS if not args.only or job.name in args.only]
+    print(f"🚀 Refreshing {', '.join(job.provider_name for job in jobs)}")
+
+    started = time.perf_counter()
+    results = refresh(jobs, timeouts, seed=not args.no_seed, use_fingerprints=not args.no_fingerprints)
+    print(report(results, time.perf_counter() - started))
+
+    sys.exit(0 if all(r.ok for r in results) else 1)
@@ -0,0 +1,300 @@
+# records.py
+"""
+Line-delimited record format shared by the scrapers and the seeder.
+
+Scrapers build one ShowtimeRecord per showtime, with the start time
+already parsed, and hand it to a sink (sinks.py): the database, an
+.ndjson file, or the legacy .json document.
+
+In an .ndjson file each line is one showtime:
+
+    {"movie_title": "...", "poster": null, "format": "2D", "date_label": "2030-01-01",
+     "cinema_name": "...", "version_label": "2D", "hall": "H1",
+     "audio_language": null, "subtitle_language": null, "time": "20:40", "url": null,
+     "start_time": "2030-01-01T20:40:00"}
+
+`start_time` is optional; without it the start time is parsed from
+`url`, or `date_label` + `time`.
+
+Scrapers append lines as they scrape and the seeder reads them as a
+stream, so neither side holds the whole dataset in memory. A complete
+file ends with {"_eof": true}; a scraper that fails writes
+{"_eof": true, "incomplete": true} so the seeder never treats a partial
+scrape as the full truth (which would delete the missing showtimes).
+"""
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterator, Optional
+from urllib.parse import urlparse, parse_qs, unquote
+
+# the fields every record has (and that fingerprints.py hashes)
+RECORD_FIELDS = (
+    "movie_title",
+    "poster",
+    "format",
+    "date_label",
+    "cinema_name",
+    "version_label",
+    "hall",
+    "audio_language",
+    "subtitle_language",
+    "time",
+    "url",
+)
+
+EOF_KEY = "_eof"
+
+
+class IncompleteRecords(RuntimeError):
+    pass
+
+
+# -------------------------------------------------------
+# TIME PARSING HELPERS
+# -------------------------------------------------------
+def parse_time_str(text: str):
+    m = re.search(r"(\d{1,2}:\d{2})(?:\s*(AM|PM|am|pm))?", text)
+    if not m:
+        return None
+
+    hhmm = m.group(1)
+    ampm = m.group(2)
+
+    try:
+        if ampm:
+            return datetime.strptime(f"{hhmm} {ampm}", "%I:%M %p").time()
+        return datetime.strptime(hhmm, "%H:%M").time()
+    except:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def parse_date(date_str: str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except:
+        return None
+
+
+def parse_showdate_from_url(href: str):
+    if not href:
+        return None
+
+    parsed = urlparse(href)
+    q = parse_qs(parsed.query)
+
+    if "ShowDate" in q:
+        raw = unquote(q["ShowDate"][0])
+        for fmt in ("%d-%b-%Y %I:%M:%S %p", "%d-%b-%Y %I:%M %p"):
+            try:
+                return datetime.strptime(raw, fmt)
+            except:
+                continue
+
+    return None
+
+
+def parse_start_time(date_label: Optional[str], time_str: Optional[str],
+                     url: Optional[str] = None) -> Optional[datetime]:
+    """
+    The booking URL's ShowDate if it has one, else the date label (today
+    if it does not parse) combined with the time. None without a time.
+    """
+    dt = parse_showdate_from_url(url) if url else None
+    if dt:
+        return dt
+
+    time_val = parse_time_str(time_str or "")
+    if not time_val:
+        return None
+    return datetime.combine(parse_date(date_label) or datetime.now().date(), time_val)
+
+
+# -------------------------------------------------------
+# RECORD
+# -------------------------------------------------------
+@dataclass(slots=True)
+class ShowtimeRecord:
+    movie_title: str
+    cinema_name: str
+    start_time: datetime
+    version_label: Optional[str] = None
+    hall: Optional[str] = None
+    audio_language: Optional[str] = None
+    subtitle_language: Optional[str] = None
+    url: Optional[str] = None
+    poster: Optional[str] = None
+    format: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, r: dict) -> Optional["ShowtimeRecord"]:
+        """Parses a flat record; None when it has no usable start time."""
+        if r.get("start_time"):
+            start_time = datetime.fromisoformat(r["start_time"])
+        else:
+            start_time = parse_start_time(r.get("date_label"), r.get("time"), r.get("url"))
+            if start_time is None:
+                return None
+
+        return cls(
+            r.get("movie_title") or "Unknown",
+            r.get("cinema_name"),
+            start_time,
+            r.get("version_label"),
+            r.get("hall"),
+            r.get("audio_language"),
+            r.get("subtitle_language"),
+            r.get("url"),
+            r.get("poster"),
+            r.get("format"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "movie_title": self.movie_title,
+            "poster": self.poster,
+            "format": self.format,
+            "date_label": self.start_time.date().isoformat(),
+            "cinema_name": self.cinema_name,
+            "version_label": self.version_label,
+            "hall": self.hall,
+            "audio_language": self.audio_language,
+            "subtitle_language": self.subtitle_language,
+            "time": self.start_time.strftime("%H:%M"),
+            "url": self.url,
+            "start_time": self.start_time.isoformat(),
+        }
+
+
+def flatten(movie: dict, date_entry: dict) -> Iterator[dict]:
+    """
+    Records for one date of a movie in the nested scraper layout
+    (movie -> dates -> cinemas -> sessions -> times).
+    """
+    for c in date_entry.get("cinemas", []):
+        for sess in c.get("sessions", []):
+            for t in sess.get("times", []):
+                if isinstance(t, dict):
+                    time_str, url = t.get("time"), t.get("url")
+                else:
+                    time_str, url = t, None
+
+                yield {
+                    "movie_title": movie.get("movie_title"),
+                    "poster": movie.get("poster"),
+                    "format": movie.get("format"),
+                    "date_label": date_entry.get("date_label"),
+                    "cinema_name": c.get("cinema_name"),
+                    "version_label": sess.get("version_label"),
+                    "hall": sess.get("hall"),
+                    "audio_language": sess.get("audio_language"),
+                    "subtitle_language": sess.get("subtitle_language"),
+                    "time": time_str,
+                    "url": url,
+                }
+
+
+# -------------------------------------------------------
+# WRITER
+# -------------------------------------------------------
+class NdjsonWriter:
+    """
+    Appends one record per line and flushes, so a follower sees each
+    record as soon as it is written.
+
+        with NdjsonWriter("major.ndjson") as out:
+            out.write(record)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._f = open(path, "w", encoding="utf-8")
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def write(self, record: dict):
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.count += 1
+
+    def write_all(self, records):
+        for r in records:
+            self.write(r)
+
+    def close(self, complete: bool = True):
+        if self._f.closed:
+            return
+        marker = {EOF_KEY: True}
+        if not complete:
+            marker["incomplete"] = True
+        self._f.write(json.dumps(marker) + "\n")
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+        return False
+
+
+# -------------------------------------------------------
+# READER
+# -------------------------------------------------------
+def read_records(path: str, follow: bool = False, poll_interval: float = 0.5,
+                 idle_timeout: Optional[float] = 600) -> Iterator[dict]:
+    """
+    Yields records one at a time.
+
+    With `follow`, waits for the file to appear and keeps reading while a
+    scraper is still writing it, until the EOF marker. Raises
+    IncompleteRecords if the file ends without a clean EOF marker, or if
+    nothing new arrives for `idle_timeout` seconds.
+    """
+    waited = 0.0
+    while not os.path.exists(path):
+        if not follow or (idle_timeout is not None and waited >= idle_timeout):
+            raise FileNotFoundError(path)
+        time.sleep(poll_interval)
+        waited += poll_interval
+
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        idle = 0.0
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                if idle_timeout is not None and idle >= idle_timeout:
+                    raise IncompleteRecords(f"{path}: no new records for {idle_timeout}s")
+                time.sleep(poll_interval)
+                idle += poll_interval
+                continue
+
+            idle = 0.0
+            buffer += line
+            if not buffer.endswith("\n"):
+                # writer is mid-line
+                continue
+
+            line, buffer = buffer.strip(), ""
+            if not line:
+                continue
+
+            record = json.loads(line)
+            if record.get(EOF_KEY):
+                if record.get("incomplete"):
+                    raise IncompleteRecords(f"{path}: scraper did not finish")
+                return
+            yield record
+
+    raise IncompleteRecords(f"{path}: missing end-of-file marker")
@@ -0,0 +1,500 @@
+# scheduler.py
+"""
+Long-running refresh daemon that re-scrapes each provider in slices and
+writes only the slices that changed.
+
+    python scheduler.py                      # Major, Prime and Legend
+    python scheduler.py --only major --only prime
+    python scheduler.py --once               # check every slice once and exit
+
+A slice is the smallest unit a scraper can fetch on its own:
+
+    major:<cinema id>:<date>   one cinema's showtimes on one date (API page)
+    prime:<date>               one date tab of the static page
+    legend:<movie url>         one movie page (all its dates)
+
+Each slice gets a base interval from how far ahead its date is (today
+every 15 minutes, a week out every 6 hours). The interval then adapts:
+it halves when the slice changed and grows by half when it did not, within
+MIN_FACTOR..MAX_FACTOR of the base. A fetched slice is hashed; only a
+changed hash is written, through BulkSeeder with a SeedScope so that
+only showtimes inside the slice can be deleted. Slice hashes are kept
+in seed_fingerprints, so a restarted scheduler does not rewrite
+unchanged slices.
+"""
+import argparse
+import asyncio
+import signal
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import fingerprints
+from bulk_seed import BulkSeeder, SeedScope
+from database import Base, SessionLocal, engine
+from fingerprints import SLICE_SCOPE
+from records import RECORD_FIELDS, ShowtimeRecord
+from seed_from_json import movie_external_id, seed_row
+
+# base refresh interval (seconds) by days ahead of today, nearest first
+BASE_INTERVALS = (
+    (0, 15 * 60),
+    (1, 30 * 60),
+    (3, 2 * 3600),
+    (7, 6 * 3600),
+)
+FAR_INTERVAL = 12 * 3600
+
+# how the interval adapts to what a check found, and its bounds
+CHANGED_FACTOR = 0.5
+UNCHANGED_FACTOR = 1.5
+MIN_FACTOR = 0.5
+MAX_FACTOR = 4
+
+# how often each source re-lists its slices (new dates, new movies)
+DISCOVER_EVERY = 30 * 60
+# retry delay for a slice (or a listing) that failed
+RETRY_DELAY = 5 * 60
+# longest sleep between two checks
+MAX_SLEEP = 60
+
+
+def base_interval(days_ahead: Optional[int]) -> float:
+    if days_ahead is None:
+        return FAR_INTERVAL
+    for max_days, seconds in BASE_INTERVALS:
+        if days_ahead <= max_days:
+            return seconds
+    return FAR_INTERVAL
+
+
+def _duration(seconds: float) -> str:
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds:.0f}s"
+
+
+# -------------------------------------------------------
+# SLICES
+# -------------------------------------------------------
+class SliceSpec(NamedTuple):
+    key: str
+    scope: SeedScope
+    show_date: Optional[date]  # None: spans dates, known after the first fetch
+    target: Any  # what the source needs to fetch it
+
+
+@dataclass(slots=True)
+class Slice:
+    key: str
+    source: "Source"
+    scope: SeedScope
+    show_date: Optional[date]
+    target: Any
+    digest: Optional[str] = None
+    interval: Optional[float] = None
+    due: float = 0.0
+    checks: int = 0
+    changes: int = 0
+
+    def days_ahead(self, today: date) -> Optional[int]:
+        return (self.show_date - today).days if self.show_date else None
+
+    def adapt(self, changed: bool, today: date):
+        base = base_interval(self.days_ahead(today))
+        interval = (self.interval or base) * (CHANGED_FACTOR if changed else UNCHANGED_FACTOR)
+        self.interval = min(max(interval, base * MIN_FACTOR), base * MAX_FACTOR)
+
+
+def records_digest(records: List[ShowtimeRecord]) -> str:
+    """Hash of a slice's records, independent of their order."""
+    rows = sorted(
+        (r.to_dict() for r in records),
+        key=lambda d: [str(d.get(f)) for f in RECORD_FIELDS],
+    )
+    h = fingerprints.new_hash()
+    for row in rows:
+        fingerprints.update_record(h, row)
+    return h.hexdigest()
+
+
+# -------------------------------------------------------
+# SOURCES
+# -------------------------------------------------------
+class Source(ABC):
+    """
+    Lists a provider's slices and fetches them. fetch() returns, per slice
+    key, the slice's records or the exception that fetching it raised.
+    """
+    name: str
+    provider_name: str
+
+    @abstractmethod
+    def discover(self) -> List[SliceSpec]:
+        ...
+
+    @abstractmethod
+    def fetch(self, slices: List[Slice]) -> Dict[str, Any]:
+        ...
+
+
+class MajorSource(Source):
+    """API pages through the scraper's client, so its HTTP cache applies."""
+    name = "major"
+
+    def __init__(self):
+        from http_client import HttpCache
+        from scraper import major_scraper
+
+        self.scraper = major_scraper
+        self.provider_name = major_scraper.PROVIDER_NAME
+        cache = HttpCache(major_scraper.CACHE_DIR) if major_scraper.CACHE_DIR else None
+        self.client = major_scraper.MajorClient(cache=cache)
+        self.pool = ThreadPoolExecutor(max_workers=major_scraper.WORKERS, thread_name_prefix="major")
+
+    def discover(self) -> List[SliceSpec]:
+        # a cinema whose dates cannot be read fails the whole listing: a
+        # partial one would retire that cinema's slices
+        def dates_of(cinema):
+            return self.client.get_dates(cinema["id"]).json()
+
+        specs = []
+        for cinema, dates in zip(self.scraper.CINEMAS, self.pool.map(dates_of, self.scraper.CINEMAS)):
+            for raw_date in dates:
+                show_date = date.fromisoformat(raw_date.split("T")[0])
+                specs.append(SliceSpec(
+                    f"major:{cinema['id']}:{show_date}",
+                    SeedScope(dates={show_date}, cinemas={cinema["name"]}),
+                    show_date,
+                    (cinema, raw_date),
+                ))
+        return specs
+
+    def fetch(self, slices: List[Slice]) -> Dict[str, Any]:
+        def one(s):
+            cinema, raw_date = s.target
+            try:
+                response = self.client.get_showtimes(cinema["id"], raw_date)
+                return self.client.records(response, cinema, s.show_date)
+            except Exception as e:
+                return e
+
+        return {s.key: result for s, result in zip(slices, self.pool.map(one, slices))}
+
+
+class PrimeSource(Source):
+    """Date tabs of the static page; one download serves every due tab."""
+    name = "prime"
+
+    def __init__(self):
+        from http_client import make_session
+        from scraper import prime_scraper
+
+        self.scraper = prime_scraper
+        self.provider_name = prime_scraper.PROVIDER_NAME
+        self.session = make_session(prime_scraper.HEADERS)
+
+    def _tabs_by_date(self) -> dict:
+        tabs = {}
+        for tab in self.scraper.fetch_static_tabs(self.session):
+            show_date = self.scraper.parse_real_date(tab["label"] or "")
+            if show_date:
+                tabs[show_date] = tab
+        return tabs
+
+    def discover(self) -> List[SliceSpec]:
+        return [
+            SliceSpec(f"prime:{show_date}", SeedScope(dates={show_date}), show_date, None)
+            for show_date in self._tabs_by_date()
+        ]
+
+    def fetch(self, slices: List[Slice]) -> Dict[str, Any]:
+        try:
+            tabs = self._tabs_by_date()
+        except Exception as e:
+            return {s.key: e for s in slices}
+        # a date no longer listed has no showtimes left
+        return {
+            s.key: list(self.scraper.tab_records(tabs[s.show_date])) if s.show_date in tabs else []
+            for s in slices
+        }
+
+
+class LegendSource(Source):
+    """Movie pages, read by one browser session per check."""
+    name = "legend"
+
+    def __init__(self, concurrency: Optional[int] = None):
+        from scraper import legend_scraper
+
+        self.scraper = legend_scraper
+        self.provider_name = legend_scraper.PROVIDER_NAME
+        self.concurrency = concurrency or legend_scraper.CONCURRENCY
+
+    def discover(self) -> List[SliceSpec]:
+        async def run():
+            async with self.scraper.open_pool(1) as pool:
+                return await self.scraper.list_movies(pool)
+
+        return [
+            SliceSpec(
+                f"legend:{movie['url']}",
+                SeedScope(movies={movie_external_id(self.provider_name, movie["title"])}),
+                None,
+                movie,
+            )
+            for movie in asyncio.run(run())
+        ]
+
+    def fetch(self, slices: List[Slice]) -> Dict[str, Any]:
+        async def run():
+            async with self.scraper.open_pool(self.concurrency) as pool:
+                return await asyncio.gather(
+                    *(self.scraper.scrape_movie(pool, s.target) for s in slices),
+                    return_exceptions=True,
+                )
+
+        try:
+            results = asyncio.run(run())
+        except Exception as e:
+            return {s.key: e for s in slices}
+        return {s.key: result for s, result in zip(slices, results)}
+
+
+SOURCES = {
+    "major": MajorSource,
+    "prime": PrimeSource,
+    "legend": LegendSource,
+}
+
+
+# -------------------------------------------------------
+# WRITES
+# -------------------------------------------------------
+def write_slice(session_factory, provider_name: str, s: Slice, records: List[ShowtimeRecord],
+                digest: Optional[str]) -> BulkSeeder:
+    """
+    Syncs one slice in its own transaction; nothing outside it is deleted.
+    Without a digest the slice's hash is removed (a retired slice).
+    """
+    db = session_factory()
+    try:
+        seeder = BulkSeeder(db, provider_name, scope=s.scope)
+        for record in records:
+            seeder.add(seed_row(provider_name, record))
+        seeder.flush()
+        fingerprints.save_slice(db, seeder.provider_id, s.key, digest)
+        seeder.finish()
+    finally:
+        db.close()
+    return seeder
+
+
+# -------------------------------------------------------
+# SCHEDULER
+# -------------------------------------------------------
+class Scheduler:
+    def __init__(self, sources: List[Source], session_factory=SessionLocal,
+                 discover_every: float = DISCOVER_EVERY):
+        self.sources = sources
+        self.session_factory = session_factory
+        self.discover_every = discover_every
+        self.slices: Dict[str, Slice] = {}
+        # no longer listed: their showtimes are deleted on the next tick
+        self.retiring: Dict[str, Slice] = {}
+        self.next_discover = {source.name: 0.0 for source in sources}
+        self.stopping = threading.Event()
+        self._fetchers = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="fetch")
+        self._saved = self._load_digests()
+
+    def _load_digests(self) -> Dict[str, str]:
+        """Slice hashes from earlier runs, so unchanged slices are not rewritten."""
+        db = self.session_factory()
+        try:
+            saved = {}
+            for source in self.sources:
+                for scope, digest in fingerprints.load(db, source.provider_name).items():
+                    if scope.startswith(SLICE_SCOPE):
+                        saved[scope[len(SLICE_SCOPE):]] = digest
+            return saved
+        finally:
+            db.close()
+
+    # ---------------------------------------------------
+    # DISCOVERY
+    # ---------------------------------------------------
+    def discover(self, source: Source, now: float):
+        try:
+            specs = source.discover()
+        except Exception as e:
+            print(f"❌ Listing {source.provider_name} slices failed: {e}")
+            self.next_discover[source.name] = now + RETRY_DELAY
+            return
+
+        listed = {spec.key for spec in specs}
+        current = [key for key, s in self.slices.items() if s.source is source]
+        if current and not listed:
+            # an empty listing is far more likely a broken page than a
+            # provider without showtimes; keep everything
+            print(f"⚠️ {source.provider_name}: listing came back empty, keeping {len(current)} slices")
+            self.next_discover[source.name] = now + RETRY_DELAY
+            return
+
+        retired = 0
+        for key in current:
+            if key not in listed:
+                self.retiring[key] = self.slices.pop(key)
+                retired += 1
+
+        added = 0
+        for spec in specs:
+            s = self.slices.get(spec.key)
+            if s is None:
+                self.retiring.pop(spec.key, None)
+                self.slices[spec.key] = Slice(
+                    spec.key, source, spec.scope, spec.show_date, spec.target,
+                    digest=self._saved.get(spec.key), due=now,
+                )
+                added += 1
+            else:
+                s.target = spec.target
+        self.next_discover[source.name] = now + self.discover_every
+        print(f"🗂️ {source.provider_name}: {len(specs)} slices listed, {added} new, {retired} retired")
+
+    def _drop_past(self, today: date):
+        """
+        Forgets dated slices whose date has passed. Slices spanning dates
+        (Legend movies) only go when their listing drops them.
+        """
+        for key in [
+            k for k, s in self.slices.items()
+            if s.scope.dates is not None and s.show_date and s.show_date < today
+        ]:
+            del self.slices[key]
+
+    def _retire(self):
+        """Deletes the showtimes of slices the provider no longer lists."""
+        for key, s in list(self.retiring.items()):
+            try:
+                seeder = write_slice(self.session_factory, s.source.provider_name, s, [], None)
+            except Exception as e:
+                print(f"❌ {key}: retiring failed, retrying next tick: {e}")
+                continue
+            del self.retiring[key]
+            self._saved.pop(key, None)
+            print(f"🧹 {key}: no longer listed | {seeder.summary()}")
+
+    # ---------------------------------------------------
+    # CHECKS
+    # ---------------------------------------------------
+    def tick(self) -> float:
+        """Checks every due slice; returns the seconds until the next one is due."""
+        now, today = time.time(), date.today()
+        self._drop_past(today)
+
+        for source in self.sources:
+            if now >= self.next_discover[source.name]:
+                self.discover(source, now)
+        self._retire()
+
+        due = {source.name: [] for source in self.sources}
+        for s in self.slices.values():
+            if s.due <= now:
+                due[s.source.name].append(s)
+
+        # providers are fetched side by side; writes happen here, one at a time
+        fetches = {
+            source.name: self._fetchers.submit(source.fetch, due[source.name])
+            for source in self.sources if due[source.name]
+        }
+        checked = changed = failed = 0
+        for source in self.sources:
+            if source.name not in fetches:
+                continue
+            results = fetches[source.name].result()
+            for s in due[source.name]:
+                outcome = self.check(s, results.get(s.key), today)
+                checked += 1
+                changed += outcome == "changed"
+                failed += outcome == "failed"
+
+        if checked:
+            print(f"🔁 {checked} slices checked, {changed} changed, {failed} failed, "
+                  f"{len(self.slices)} scheduled")
+
+        upcoming = [s.due for s in self.slices.values()] + list(self.next_discover.values())
+        if self.retiring:
+            upcoming.append(now + RETRY_DELAY)
+        return max(0.0, min(upcoming) - time.time()) if upcoming else MAX_SLEEP
+
+    def check(self, s: Slice, result, today: date) -> str:
+        now = time.time()
+        s.checks += 1
+        if result is None or isinstance(result, BaseException):
+            print(f"❌ {s.key}: {result}")
+            s.due = now + min(RETRY_DELAY, s.interval or RETRY_DELAY)
+            return "failed"
+
+        records = result
+        if s.scope.dates is None:
+            # slices spanning dates are scheduled by their nearest showtime
+            upcoming = [r.start_time.date() for r in records if r.start_time.date() >= today]
+            s.show_date = min(upcoming) if upcoming else None
+
+        digest = records_digest(records)
+        changed = digest != s.digest
+        if changed:
+            try:
+                seeder = write_slice(self.session_factory, s.source.provider_name, s, records, digest)
+            except Exception as e:
+                print(f"❌ {s.key}: write failed: {e}")
+                s.due = now + RETRY_DELAY
+                return "failed"
+            s.digest = self._saved[s.key] = digest
+            s.changes += 1
+
+        s.adapt(changed, today)
+        s.due = now + s.interval
+        if changed:
+            print(f"✏️ {s.key}: {seeder.summary()} | next in {_duration(s.interval)}")
+        return "changed" if changed else "unchanged"
+
+    # ---------------------------------------------------
+    # LOOP
+    # ---------------------------------------------------
+    def run(self, once: bool = False):
+        while not self.stopping.is_set():
+            wait = self.tick()
+            if once:
+                break
+            self.stopping.wait(min(max(wait, 1.0), MAX_SLEEP))
+        self._fetchers.shutdown(wait=False)
+
+    def stop(self, *_):
+        print("🛑 Stopping after the current check")
+        self.stopping.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh showtimes slice by slice, near dates most often")
+    parser.add_argument("--only", action="append", choices=list(SOURCES),
+                        help="run only these providers (repeatable)")
+    parser.add_argument("--once", action="store_true", help="check every slice once and exit")
+    parser.add_argument("--discover-every", type=float, default=DISCOVER_EVERY,
+                        help="seconds between re-listing each provider's slices")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    sources = [SOURCES[name]() for name in SOURCES if not args.only or name in args.only]
+    scheduler = Scheduler(sources, discover_every=args.discover_every)
+
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    print(f"⏰ Scheduling {', '.join(source.provider_name for source in sources)}")
+    scheduler.run(once=args.once)
@@ -66,6 +66,10 @@ class MovieRead(MovieBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MovieMatch(MovieRead):
+    score: float
+
+
 # -----------------------------
 # Booking Links
 # -----------------------------
@@ -96,3 +100,26 @@ class ShowtimeRead(ShowtimeBase):
     booking_links: List[BookingLinkRead] = []
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# -----------------------------
+# Pages (keyset pagination)
+# -----------------------------
+class MoviePage(BaseModel):
+    items: List[MovieRead]
+    next_cursor: Optional[str] = None
+
+
+class CinemaPage(BaseModel):
+    items: List[CinemaRead]
+    next_cursor: Optional[str] = None
+
+
+class ShowtimePage(BaseModel):
+    items: List[ShowtimeRead]
+    next_cursor: Optional[str] = None
+
+
+class BookingLinkPage(BaseModel):
+    items: List[BookingLinkRead]
+    next_cursor: Optional[str] = None
@@ -1,13 +1,26 @@
+import argparse
 import asyncio
-import json
+import os
 import re
+import sys
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+from zoneinfo import ZoneInfo
 
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
+# records.py / sinks.py live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from records import ShowtimeRecord, parse_start_time, parse_time_str
+from sinks import add_sink_argument, open_sinks, sink_kinds
+
 BASE_URL = "https://www.legend.com.kh"
-OUTPUT_FILE = "legend.json"
+PROVIDER_NAME = "Legend Cinema"
+
+# movie pages scraped at the same time, each in its own tab
+CONCURRENCY = int(os.getenv("LEGEND_CONCURRENCY", "4"))
 
 
 async def block_resources(route):
@@ -26,7 +39,6 @@ async def safe_goto(page, url, retries=3):
                 wait_until="domcontentloaded",
                 timeout=60000,
             )
-            await page.wait_for_timeout(3000)
             return
         except PlaywrightTimeout:
             if attempt == retries:
@@ -66,44 +78,295 @@ async def extract_movies(page):
     return movies
 
 
+# -------------------------------------------------------
+# SHOWTIMES FROM THE SITE'S API RESPONSES
+# -------------------------------------------------------
+# how long a movie page may keep loading before we read what arrived
+NETWORK_IDLE_TIMEOUT = 15000
+LOCAL_TZ = ZoneInfo("Asia/Phnom_Penh")
+# only responses from the showtime endpoints are read; analytics, ads and
+# recommendation calls also return JSON with times in it
+SHOWTIME_URL_RE = re.compile(os.getenv("LEGEND_SHOWTIME_URL", r"showtime|session|schedule"), re.I)
+
+# payload keys, by what they hold; values found on a parent object
+# apply to every showtime below it
+TIME_KEYS = {"showtime", "show_time", "showTime", "time", "startTime", "start_time", "startsAt",
+             "sessionTime", "showDateTime"}
+DATE_KEYS = {"date", "showDate", "show_date", "businessDate", "sessionDate"}
+CINEMA_KEYS = {"cinema", "cinemaName", "cinema_name", "branch", "branchName", "location",
+               "locationName", "site", "siteName"}
+HALL_KEYS = {"hall", "hallName", "screen", "screenName", "auditorium", "theater", "theatre"}
+VERSION_KEYS = {"format", "version", "experience", "screenType", "sessionType"}
+URL_KEYS = {"bookingUrl", "booking_url", "bookingLink", "url"}
+# lists whose objects are cinemas / halls, named by their "name"
+CINEMA_LIST_KEYS = {"cinemas", "branches", "locations", "sites"}
+HALL_LIST_KEYS = {"halls", "screens", "theaters", "theatres", "auditoriums"}
+# a movie object: its showtimes are only read if it is the page's movie
+MOVIE_ID_KEYS = {"movieId", "movie_id", "filmId", "film_id", "movieSlug"}
+MOVIE_TITLE_KEYS = {"movieTitle", "movie_title", "movieName", "filmTitle", "filmName"}
+# objects in these are movies, identified by their plain id / slug / title / name
+MOVIE_LIST_KEYS = {"movie", "movies", "film", "films"}
+
+
+class ResponseCapture:
+    """
+    Collects the JSON bodies of a page's XHR / fetch responses to the
+    showtime endpoints while it loads, as (url, payload) pairs. Attach
+    before navigating, detach once the page is read.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.payloads = []
+        self._reads = []
+
+    def __enter__(self):
+        self.page.on("response", self._on_response)
+        return self
+
+    def __exit__(self, *exc):
+        self.page.remove_listener("response", self._on_response)
+        for task in self._reads:
+            task.cancel()
+        return False
+
+    def _on_response(self, response):
+        if response.request.resource_type not in {"xhr", "fetch"} or not response.ok:
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        if not SHOWTIME_URL_RE.search(urlparse(response.url).path):
+            return
+        self._reads.append(asyncio.ensure_future(self._read(response)))
+
+    async def _read(self, response):
+        try:
+            self.payloads.append((response.url, await response.json()))
+        except Exception:
+            pass  # body gone (page navigated) or not JSON after all
+
+    async def drain(self):
+        await asyncio.gather(*self._reads, return_exceptions=True)
+        return self.payloads
+
+
+def _text(value):
+    """A label from a str, or from an object's name / title."""
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("title")
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+def _first(obj: dict, keys):
+    for key in obj:
+        if key not in keys:
+            continue
+        value = _text(obj[key])
+        if value:
+            return value
+    return None
+
+
+def _start_time(value: str, date_label):
+    """ISO date-times are converted to local time; bare times use `date_label`."""
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return parse_start_time(date_label, value)
+    if dt.tzinfo:
+        dt = dt.astimezone(LOCAL_TZ).replace(tzinfo=None)
+    return dt
+
+
+def _norm(value) -> str:
+    return re.sub(r"[^0-9a-z]+", "", str(value).casefold())
+
+
+def movie_ids(movie) -> set:
+    """The ids a payload may use for the movie: its URL slug, and the number it ends in."""
+    slug = urlparse(movie["url"]).path.rstrip("/").rsplit("/", 1)[-1]
+    ids = {_norm(slug)}
+    number = re.search(r"(\d+)$", slug)
+    if number:
+        ids.add(number.group(1))
+    return ids - {""}
+
+
+def _movie_match(obj: dict, parent_key, movie):
+    """
+    True / False if `obj` is a movie object that is / is not the page's
+    movie, None if it is not a movie object.
+    """
+    id_keys, title_keys = MOVIE_ID_KEYS, MOVIE_TITLE_KEYS
+    if parent_key in MOVIE_LIST_KEYS:
+        id_keys, title_keys = id_keys | {"id", "slug"}, title_keys | {"title", "name"}
+    ids = {_norm(obj[key]) for key in obj if key in id_keys and isinstance(obj[key], (str, int))}
+    title = _first(obj, title_keys)
+    if not ids and not title:
+        return None
+    return bool(ids & movie_ids(movie)) or (title is not None and _norm(title) == _norm(movie["title"]))
+
+
+def payload_showtimes(payload, movie, cinema_name: str = PROVIDER_NAME,
+                      date_label=None, hall=None, version=None, parent_key=None, matched=False):
+    """
+    Walks an API payload of unknown shape and yields a ShowtimeRecord for
+    every object that carries a start time, taking cinema, hall, date and
+    version from the object or the objects around it.
+
+    Only showtimes below a movie object for `movie` are read, or, with
+    `matched`, those of a payload that is about `movie` as a whole; a
+    movie object for any other movie is skipped with everything below it.
+    """
+    if isinstance(payload, list):
+        for item in payload:
+            yield from payload_showtimes(item, movie, cinema_name, date_label, hall, version,
+                                         parent_key, matched)
+        return
+    if not isinstance(payload, dict):
+        return
+
+    is_movie = _movie_match(payload, parent_key, movie)
+    if is_movie is False:
+        return
+    matched = matched or bool(is_movie)
+
+    name = _text(payload.get("name"))
+    cinema_name = _first(payload, CINEMA_KEYS) or (name if parent_key in CINEMA_LIST_KEYS else None) \
+        or cinema_name
+    hall = _first(payload, HALL_KEYS) or (name if parent_key in HALL_LIST_KEYS else None) or hall
+    version = _first(payload, VERSION_KEYS) or version
+    date_label = _first(payload, DATE_KEYS) or date_label
+    if date_label:
+        date_label = date_label[:10]
+
+    time_value = _first(payload, TIME_KEYS)
+    start_time = _start_time(time_value, date_label) if time_value else None
+    if start_time and matched:
+        url = _first(payload, URL_KEYS)
+        yield ShowtimeRecord(
+            movie_title=movie["title"],
+            cinema_name=cinema_name,
+            start_time=start_time,
+            version_label=version,
+            hall=hall,
+            url=url if url and url.startswith("http") else None,
+            format=version,
+        )
+
+    for key, value in payload.items():
+        if isinstance(value, (dict, list)):
+            yield from payload_showtimes(value, movie, cinema_name, date_label, hall, version, key,
+                                         matched)
+
+
+# -------------------------------------------------------
+# SHOWTIMES FROM THE RENDERED PAGE (FALLBACK)
+# -------------------------------------------------------
 TIME_RE = re.compile(r"\d{1,2}:\d{2}\s?(AM|PM)?", re.I)
 
 
+async def dom_showtimes(page, movie):
+    """Today's start times found in the page's visible text."""
+    text = await page.evaluate("() => document.body ? document.body.innerText : ''")
+
+    today = datetime.now().date()
+    start_times = set()
+    for m in TIME_RE.finditer(text):
+        time_val = parse_time_str(m.group(0))
+        if time_val:
+            start_times.add(datetime.combine(today, time_val))
+
+    return [
+        ShowtimeRecord(movie_title=movie["title"], cinema_name=PROVIDER_NAME, start_time=start_time)
+        for start_time in sorted(start_times)
+    ]
+
+
 async def extract_showtimes(page, movie):
-    await safe_goto(page, movie["url"])
-
-    await page.wait_for_timeout(3000)
-
-    content = await page.content()
-
-    times = TIME_RE.findall(content)
-    dates = []
-
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    if times:
-        dates.append({
-            "date_label": today,
-            "cinemas": [
-                {
-                    "cinema_name": "Legend Cinema",
-                    "sessions": [
-                        {
-                            "version_label": None,
-                            "hall": None,
-                            "audio_language": None,
-                            "subtitle_language": None,
-                            "times": list(set(times)),
-                        }
-                    ],
-                }
-            ],
-        })
+    """
+    The movie's showtimes, parsed from the JSON the page fetches while it
+    loads. Falls back to the page text when no payload has showtimes.
+    """
+    with ResponseCapture(page) as capture:
+        await safe_goto(page, movie["url"])
+        try:
+            await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT)
+        except PlaywrightTimeout:
+            pass  # read whatever has arrived
+        payloads = await capture.drain()
+
+    records, seen, ids = [], set(), movie_ids(movie)
+    for url, payload in payloads:
+        # an endpoint for this movie alone, e.g. /movies/123/showtimes
+        about_movie = bool(ids & {_norm(part) for part in urlparse(url).path.split("/")})
+        for record in payload_showtimes(payload, movie, matched=about_movie):
+            key = (record.cinema_name, record.hall, record.start_time)
+            if key not in seen:
+                seen.add(key)
+                records.append(record)
+
+    if records:
+        source = "api"
+    else:
+        records = await dom_showtimes(page, movie)
+        source = "page"
+    print(f"   🎞️ {movie['title']}: {len(records)} showtimes ({source})")
+    return records
+
+
+async def main(sinks=("ndjson",), concurrency=CONCURRENCY):
+    with open_sinks(sinks, PROVIDER_NAME, "legend", BASE_URL) as sink:
+        await scrape(sink, concurrency)
+
+
+# -------------------------------------------------------
+# PAGE POOL
+# -------------------------------------------------------
+class PagePool:
+    """
+    `size` tabs in one browser context, handed out one task at a time.
+    The context's route blocks images, media and fonts for every tab.
+    A tab whose scrape failed is replaced, so a crashed or stuck page
+    cannot break the movies after it.
+    """
+
+    def __init__(self, context, size: int):
+        self.context = context
+        self.size = size
+        self.pages = asyncio.Queue()
+
+    async def open(self):
+        for _ in range(self.size):
+            self.pages.put_nowait(await self.context.new_page())
+
+    @asynccontextmanager
+    async def page(self):
+        page = await self.pages.get()
+        try:
+            yield page
+        except Exception:
+            page = await self._replace(page)
+            raise
+        finally:
+            self.pages.put_nowait(page)
+
+    async def _replace(self, page):
+        try:
+            await page.close()
+        except Exception:
+            pass
+        return await self.context.new_page()
+
 
-    return dates
+async def scrape_movie(pool, movie):
+    async with pool.page() as page:
+        return await extract_showtimes(page, movie)
 
 
-async def main():
+@asynccontextmanager
+async def open_pool(concurrency=CONCURRENCY):
+    """A headless browser with a PagePool of `concurrency` tabs."""
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=True,
@@ -114,53 +377,70 @@ async def main():
             ],
         )
 
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 800},
-        )
-
-        page = await context.new_page()
-        await page.route("**/*", block_resources)
-
+        try:
+            context = await browser.new_context(
+                user_agent=(
+                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                    "AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/120.0.0.0 Safari/537.36"
+                ),
+                viewport={"width": 1280, "height": 800},
+            )
+            await context.route("**/*", block_resources)
+
+            pool = PagePool(context, max(1, concurrency))
+            await pool.open()
+            yield pool
+        finally:
+            await browser.close()
+
+
+async def list_movies(pool):
+    async with pool.page() as page:
+        return await extract_movies(page)
+
+
+async def scrape(sink, concurrency=CONCURRENCY):
+    """
+    Reads the movie list, then scrapes up to `concurrency` movie pages at
+    a time. Movies are written in listing order, not completion order,
+    so the output is the same on every run. A movie that fails is skipped
+    and the sink is closed incomplete, so seeding does not delete it.
+    """
+    started = time.perf_counter()
+    failed = []
+    async with open_pool(concurrency) as pool:
         print("🎬 Scraping Legend Cinema")
 
-        movies_raw = await extract_movies(page)
-        print(f"🎥 Found {len(movies_raw)} movies")
+        movies_raw = await list_movies(pool)
+        print(f"🎥 Found {len(movies_raw)} movies, {pool.size} at a time")
 
-        movies_out = []
+        tasks = [asyncio.create_task(scrape_movie(pool, m)) for m in movies_raw]
 
-        for m in movies_raw:
-            try:
-                dates = await extract_showtimes(page, m)
-                if not dates:
+        try:
+            for m, task in zip(movies_raw, tasks):
+                try:
+                    records = await task
+                except Exception as e:
+                    print(f"❌ Failed movie {m['title']}: {e}")
+                    failed.append(m["title"])
                     continue
 
-                movies_out.append({
-                    "booking_link": m["url"],
-                    "movie_title": m["title"],
-                    "poster": None,
-                    "format": None,
-                    "dates": dates,
-                })
-            except Exception as e:
-                print(f"❌ Failed movie {m['title']}: {e}")
-
-        await browser.close()
-
-        output = {
-            "base_url": BASE_URL,
-            "movies": movies_out,
-        }
-
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+                for record in records:
+                    sink.write(record)
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        print(f"✅ Saved {OUTPUT_FILE} | Movies: {len(movies_out)}")
+    print(f"🎞️ Legend Cinema: {sink.count} showtimes in {time.perf_counter() - started:.1f}s")
+    if failed:
+        print(f"⚠️ {len(failed)} movies failed, marking the scrape incomplete")
+        sink.close(complete=False)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape Legend Cinema showtimes")
+    add_sink_argument(parser)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="movie pages open at once")
+    args = parser.parse_args()
+    asyncio.run(main(sink_kinds(args), concurrency=args.concurrency))
@@ -1,8 +1,30 @@
-import requests
-import json
-from time import sleep
-
-BASE = "https://majorcineplex.com.kh/api"
+import argparse
+import os
+import sys
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+
+# records.py / sinks.py / http_client.py live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import HttpCache, TokenBucket, get_cached, make_session
+from records import ShowtimeRecord
+from sinks import add_sink_argument, open_sinks, sink_kinds
+
+# MAJOR_API_BASE points the scraper at a stub server (see benchmark.py major)
+BASE = os.getenv("MAJOR_API_BASE", "https://majorcineplex.com.kh/api")
+SITE_URL = "https://majorcineplex.com.kh"
+PROVIDER_NAME = "Major Cineplex"
+
+# concurrent requests, and the request rate they share
+WORKERS = int(os.getenv("MAJOR_WORKERS", "8"))
+RATE = float(os.getenv("MAJOR_RATE", "8"))
+
+# on-disk HTTP cache; empty disables it
+CACHE_DIR = os.getenv("MAJOR_CACHE_DIR", ".http_cache/major")
+# bump when normalize_payload() changes, so cached records are rebuilt
+NORMALIZE_VERSION = 1
+RECORDS_NAME = f"records-v{NORMALIZE_VERSION}"
 
 CINEMAS = [
     {"id": "0000008101", "name": "Major Aeon Mall Phnom Penh"},
@@ -23,169 +45,163 @@ HEADERS = {
 # --------------------------------------------------
 # API CALLS
 # --------------------------------------------------
-def get_dates(cinema_id):
-    r = requests.get(
-        f"{BASE}/date-show-movie",
-        params={"cinema": cinema_id},
-        headers=HEADERS,
-        timeout=10,
-    )
-    r.raise_for_status()
-    return r.json()
-
-
-def get_showtimes(cinema_id, date):
-    r = requests.get(
-        f"{BASE}/show-movie",
-        params={"cinema": cinema_id, "date": date},
-        headers=HEADERS,
-        timeout=10,
-    )
-    r.raise_for_status()
-    return r.json()
+class MajorClient:
+    """
+    Keep-alive session, rate limit and (optional) HTTP cache shared by all
+    worker threads. Both calls return http_client.CachedResponse.
+    """
+
+    def __init__(self, workers: int = WORKERS, rate: float = RATE, burst=None,
+                 cache: HttpCache = None):
+        self.session = make_session(HEADERS, pool_size=workers)
+        self.bucket = TokenBucket(rate, burst)
+        self.cache = cache
+
+    def get_dates(self, cinema_id):
+        return get_cached(self.session, self.bucket, self.cache, f"{BASE}/date-show-movie",
+                          params={"cinema": cinema_id})
+
+    def get_showtimes(self, cinema_id, date):
+        return get_cached(self.session, self.bucket, self.cache, f"{BASE}/show-movie",
+                          params={"cinema": cinema_id, "date": date})
+
+    def records(self, response, cinema, show_date):
+        """
+        The page's ShowtimeRecords. For a page that has not changed since it
+        was cached, the records normalized last time are reused.
+        """
+        if self.cache and response.unchanged:
+            saved = self.cache.load_derived(response, RECORDS_NAME)
+            if saved is not None:
+                return [ShowtimeRecord.from_dict(r) for r in saved]
+
+        records = list(normalize_payload(response.json(), cinema, show_date))
+        if self.cache:
+            self.cache.save_derived(response, RECORDS_NAME, [r.to_dict() for r in records])
+        return records
 
 
 # --------------------------------------------------
 # MAIN
 # --------------------------------------------------
-def main():
-    movies_index = {}
-
-    for cinema in CINEMAS:
-        print(f"🎬 Scraping {cinema['name']}")
-
+def main(sinks=("ndjson",), workers=WORKERS, rate=RATE, cache_dir=CACHE_DIR):
+    started = clock.perf_counter()
+    cache = HttpCache(cache_dir) if cache_dir else None
+    with open_sinks(sinks, PROVIDER_NAME, "major", SITE_URL) as sink:
+        scrape(sink, MajorClient(workers, rate, cache=cache), workers)
+        print(f"🎞️ Major Cineplex: {sink.count} showtimes in {clock.perf_counter() - started:.1f}s")
+    if cache:
+        print(f"🗄️ HTTP cache: {dict(cache.stats)}")
+
+
+def scrape(sink, client, workers=WORKERS):
+    """
+    Fetches every cinema's dates, then every (cinema, date) page, with
+    `workers` threads. Pages are written in request order, not completion
+    order, so the output (and its fingerprints) is the same on every run.
+    A request that still fails after its retries is skipped and the sink
+    is closed incomplete, so seeding does not delete what it missed.
+    """
+    failed = []
+
+    def dates_of(cinema):
         try:
-            dates = get_dates(cinema["id"])
+            return client.get_dates(cinema["id"]).json()
         except Exception as e:
-            print("❌ Failed dates:", e)
-            continue
+            print(f"❌ Failed dates for {cinema['name']}:", e)
+            failed.append(cinema["name"])
+            return []
 
-        for raw_date in dates:
-            date_label = raw_date.split("T")[0]
-            print(f"   📅 {date_label}")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="major") as pool:
+        pages = [
+            (cinema, raw_date)
+            for cinema, dates in zip(CINEMAS, pool.map(dates_of, CINEMAS))
+            for raw_date in dates
+        ]
+        print(f"🎬 {len(pages)} cinema dates to fetch")
 
+        futures = [pool.submit(client.get_showtimes, cinema["id"], raw_date) for cinema, raw_date in pages]
+
+        for (cinema, raw_date), future in zip(pages, futures):
+            date_label = raw_date.split("T")[0]
             try:
-                payload = get_showtimes(cinema["id"], raw_date)
+                response = future.result()
+                records = client.records(response, cinema, date.fromisoformat(date_label))
             except Exception as e:
-                print("❌ Failed showtimes:", e)
+                print(f"❌ Failed showtimes for {cinema['name']} {date_label}:", e)
+                failed.append(f"{cinema['name']} {date_label}")
                 continue
 
-            # 🔑 NORMALIZE PAYLOAD (dict OR list)
-            if isinstance(payload, list):
-                items = payload
-            else:
-                items = [payload]
-
-            for item in items:
-                theaters = item.get("theaters", [])
-
-                for hall in theaters:
-                    hall_name = hall.get("name")
-
-                    for movie in hall.get("movies", []):
-                        title = movie.get("title")
-                        poster = movie.get("posterImage")
-                        category = movie.get("category")
-                        rating = movie.get("rating")
-
-                        if not title:
-                            continue
-
-                        format_label = (
-                            f"{category}-{rating}" if rating else category
-                        )
-
-                        movie_entry = movies_index.setdefault(
-                            title,
-                            {
-                                "booking_link": "https://majorcineplex.com.kh/showtime",
-                                "movie_title": title,
-                                "poster": (
-                                    f"https://majorcineplex.com.kh{poster}"
-                                    if poster else None
-                                ),
-                                "format": format_label,
-                                "dates": {},
-                            }
-                        )
-
-                        date_bucket = movie_entry["dates"].setdefault(
-                            date_label, {}
-                        )
-                        cinema_bucket = date_bucket.setdefault(
-                            cinema["name"], {}
-                        )
-
-                        # ❗ sessions are inside movie["movies"]
-                        for session in movie.get("movies", []):
-                            show_time = session.get("showTime")
-                            if not show_time:
-                                continue
-
-                            time_only = show_time.split("T")[1][:5]
-
-                            key = (format_label, hall_name)
-                            session_entry = cinema_bucket.setdefault(
-                                key,
-                                {
-                                    "version_label": format_label,
-                                    "hall": hall_name,
-                                    "audio_language": None,
-                                    "subtitle_language": None,
-                                    "times": [],
-                                }
-                            )
-
-                            if time_only not in session_entry["times"]:
-                                session_entry["times"].append(time_only)
-
-            sleep(0.25)
-
-    # --------------------------------------------------
-    # NORMALIZE TO PRIME FORMAT
-    # --------------------------------------------------
-    movies_output = []
-
-    for movie in movies_index.values():
-        dates_out = []
-
-        for date_label, cinemas in movie["dates"].items():
-            cinemas_out = []
-
-            for cinema_name, sessions in cinemas.items():
-                cinemas_out.append(
-                    {
-                        "cinema_name": cinema_name,
-                        "sessions": list(sessions.values()),
-                    }
-                )
+            print(f"   📅 {cinema['name']} {date_label} ({response.outcome})")
+            for record in records:
+                sink.write(record)
 
-            dates_out.append(
-                {
-                    "date_label": date_label,
-                    "cinemas": cinemas_out,
-                }
-            )
+    if failed:
+        print(f"⚠️ {len(failed)} failed requests, marking the scrape incomplete")
+        sink.close(complete=False)
 
-        movie["dates"] = dates_out
-        movies_output.append(movie)
 
-    with open("major.json", "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "base_url": "https://majorcineplex.com.kh",
-                "movies": movies_output,
-            },
-            f,
-            indent=2,
-            ensure_ascii=False,
-        )
+def normalize_payload(payload, cinema, show_date):
+    # 🔑 NORMALIZE PAYLOAD (dict OR list)
+    if isinstance(payload, list):
+        items = payload
+    else:
+        items = [payload]
+
+    for item in items:
+        theaters = item.get("theaters", [])
+
+        for hall in theaters:
+            hall_name = hall.get("name")
+
+            for movie in hall.get("movies", []):
+                title = movie.get("title")
+                poster = movie.get("posterImage")
+                category = movie.get("category")
+                rating = movie.get("rating")
+
+                if not title:
+                    continue
+
+                format_label = (
+                    f"{category}-{rating}" if rating else category
+                )
+                poster_url = (
+                    f"https://majorcineplex.com.kh{poster}"
+                    if poster else None
+                )
 
-    print(f"✅ Saved major.json | Movies: {len(movies_output)}")
+                # ❗ sessions are inside movie["movies"]
+                for session in movie.get("movies", []):
+                    show_time = session.get("showTime")
+                    if not show_time:
+                        continue
+
+                    yield ShowtimeRecord(
+                        movie_title=title,
+                        cinema_name=cinema["name"],
+                        # listed under the requested date, like the site
+                        start_time=datetime.combine(
+                            show_date,
+                            time.fromisoformat(show_time.split("T")[1][:5]),
+                        ),
+                        version_label=format_label,
+                        hall=hall_name,
+                        poster=poster_url,
+                        format=format_label,
+                    )
 
 
 # --------------------------------------------------
 # ENTRY POINT
 # --------------------------------------------------
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scrape Major Cineplex showtimes")
+    add_sink_argument(parser)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=RATE, help="requests per second, shared by all workers")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="on-disk HTTP cache")
+    parser.add_argument("--no-cache", action="store_true", help="always download every page")
+    args = parser.parse_args()
+    main(sink_kinds(args), workers=args.workers, rate=args.rate,
+         cache_dir=None if args.no_cache else args.cache_dir)
@@ -1,7 +1,11 @@
 # prime_scraper.py
+import argparse
+import os
+import re
+import sys
 import time
-import json
 from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Comment
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
@@ -9,25 +13,41 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
 
+# records.py / sinks.py live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import make_session
+from records import ShowtimeRecord, parse_time_str
+from sinks import add_sink_argument, open_sinks, sink_kinds
+
 MONTH_MAP = {
     "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
     "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
 }
 
-def parse_real_date(label: str) -> str:
+def parse_real_date(label: str):
     try:
         parts = label.replace(",", "").split()
         day = int(parts[1])
         month = MONTH_MAP[parts[3]]
         year = datetime.now().year
 
-        dt = datetime(year, month, day)
-        return dt.strftime("%Y-%m-%d")
+        return datetime(year, month, day).date()
     except:
         return None
 
 
 BASE_URL = "https://primecineplex.com/"
+PROVIDER_NAME = "Prime Cineplex"
+
+# static: parse the page HTML only; browser: Selenium only;
+# auto: static, falling back to Selenium when the HTML has no showtimes
+MODES = ("auto", "static", "browser")
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+}
 
 
 def make_driver():
@@ -56,137 +76,295 @@ def wait_for_showtimes_button(driver, timeout=20):
         return False
 
 
-def scrape_prime():
-    driver = make_driver()
-    driver.get(BASE_URL)
+# -------------------------------------------------------
+# EXTRACTION
+# -------------------------------------------------------
+# Reads date tabs straight from the DOM in one WebDriver round trip and
+# returns them as JSON:
+#   [{"id": "tab_2", "label": "Fri, 17 of Oct", "movies": [
+#       {"title": ..., "format": ..., "poster": ...,
+#        "branches": [{"name": ..., "times": ["20:40 H1", ...]}]}]}]
+# Text comes from textContent, so hidden (not yet clicked) tabs are read
+# too. A panel that holds other tab panels (SHOWTIMES) is not a date and
+# is skipped, as in static_tabs. arguments[0] limits it to one tab id;
+# null reads every tab.
+EXTRACT_TABS_JS = """
+const INLINE = new Set(["A", "B", "I", "EM", "STRONG", "SPAN", "SMALL", "SUB", "SUP", "FONT"]);
+const text = (el) => {
+  if (!el) return null;
+  const parts = [];
+  const walk = (node) => {
+    for (const child of node.childNodes) {
+      if (child.nodeType === Node.TEXT_NODE) {
+        parts.push(child.nodeValue);
+      } else if (child.nodeType === Node.ELEMENT_NODE) {
+        const gap = INLINE.has(child.tagName) ? "" : " ";
+        parts.push(gap);
+        walk(child);
+        parts.push(gap);
+      }
+    }
+  };
+  walk(el);
+  return parts.join("").replace(/\\s+/g, " ").trim();
+};
+
+const only = arguments[0];
+const anchors = Array.from(document.querySelectorAll("a.ui-tabs-anchor[href^='#tab_']"));
+return anchors
+  .map((a) => ({id: a.getAttribute("href").split("#").pop(), label: text(a)}))
+  .filter((tab) => !only || tab.id === only)
+  .map((tab) => ({...tab, panel: document.getElementById(tab.id)}))
+  .filter((tab) => !(tab.panel && tab.panel.querySelector("[id^='tab_']")))
+  .map(({panel, ...tab}) => {
+    const cards = panel ? panel.querySelectorAll(".col-md-3[style*='min-height']") : [];
+    tab.movies = Array.from(cards).map((card) => {
+      const img = card.querySelector("img#samloadimage");
+      return {
+        title: text(card.querySelector(".col-10.text-excerpt")),
+        format: text(card.querySelector(".col-2.text-excerpt")),
+        poster: img ? img.src : null,
+        branches: Array.from(card.querySelectorAll(".sambranchbg")).map((branch) => {
+          const block = branch.parentElement
+            ? Array.from(branch.parentElement.children).filter((c) => c.tagName === "DIV")[1]
+            : null;
+          return {
+            name: text(branch),
+            times: block ? Array.from(block.querySelectorAll("a")).map(text) : [],
+          };
+        }),
+      };
+    });
+    return tab;
+  });
+"""
+
+
+def tab_records(tab):
+    """ShowtimeRecords for one tab as returned by EXTRACT_TABS_JS."""
+    show_date = parse_real_date(tab["label"] or "") or datetime.now().date()
+
+    for movie in tab["movies"]:
+        movie_format = movie["format"] or None
+
+        for branch in movie["branches"]:
+            for raw in branch["times"]:  # e.g. "20:40 H1"
+                if not raw:
+                    continue
+
+                parts = raw.split()
+                time_val = parse_time_str(parts[0])
+                if not time_val:
+                    continue
+
+                yield ShowtimeRecord(
+                    movie_title=movie["title"] or "Unknown",
+                    cinema_name=f"Prime {branch['name'] or ''}",
+                    start_time=datetime.combine(show_date, time_val),
+                    version_label=movie_format,
+                    hall=parts[1] if len(parts) > 1 else None,
+                    poster=movie["poster"],
+                    format=movie_format,
+                )
+
+
+def extract_tabs(driver, tab_id=None):
+    return driver.execute_script(EXTRACT_TABS_JS, tab_id)
+
+
+def write_tabs(sink, tabs):
+    for tab in tabs:
+        print(f"\n📅 Scraping Date: {tab['label']} ({tab['id']})")
+        print(f"  🎬 Found {len(tab['movies'])} movies")
+        for record in tab_records(tab):
+            sink.write(record)
+
+
+# -------------------------------------------------------
+# STATIC HTML (NO BROWSER)
+# -------------------------------------------------------
+# The date tabs are jQuery UI tabs: every panel is already in the page
+# HTML and the tabs only show and hide them, so the same structure
+# EXTRACT_TABS_JS returns can be read from the fetched document.
+INLINE_TAGS = {"a", "b", "i", "em", "strong", "span", "small", "sub", "sup", "font"}
+TAB_ID_RE = re.compile(r"^tab_\d+$")
+
+
+class StaticParseError(RuntimeError):
+    pass
+
+
+def _text(el):
+    """Whitespace-collapsed text, split at block elements like EXTRACT_TABS_JS."""
+    if el is None:
+        return None
+    parts = []
 
-    # 1️⃣ Wait for the intro animation
-    if not wait_for_showtimes_button(driver):
-        driver.quit()
-        return
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, str):
+                parts.append(str(child))
+            elif child.name:
+                gap = "" if child.name in INLINE_TAGS else " "
+                parts.append(gap)
+                walk(child)
+                parts.append(gap)
 
-    # 2️⃣ Click SHOWTIMES (tab 1)
-    try:
-        print("👉 Clicking SHOWTIMES tab...")
-        btn = driver.find_element(By.CSS_SELECTOR, "a[href='#tab_1']")
-        driver.execute_script("arguments[0].click();", btn)
-        time.sleep(2)
-    except Exception as e:
-        print("❌ Failed to click SHOWTIMES:", e)
-        driver.quit()
-        return
+    walk(el)
+    return " ".join("".join(parts).split())
 
-    # 3️⃣ FIND DATE TABS using the REAL selector
-    try:
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.ui-tabs-anchor[href^='#tab_']"))
-        )
-    except:
-        print("❌ ERROR: Date tabs did not load")
-        driver.quit()
-        return
 
-    tab_buttons = driver.find_elements(By.CSS_SELECTOR, "a.ui-tabs-anchor[href^='#tab_']")
-    print(f"📌 Found {len(tab_buttons)} date tabs")
+def static_tabs(html: str):
+    """
+    Date tabs parsed from the page HTML. Raises StaticParseError when the
+    document has no showtimes or a date tab has no movie cards (layout
+    changed, or panels filled by script): a missing date would otherwise
+    be written as a complete scrape, and seeding deletes its showtimes.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    tabs, seen = [], set()
+
+    for a in soup.select("a[href^='#tab_']"):
+        tab_id = a["href"].split("#")[-1]
+        panel = soup.find(id=tab_id)
+        if tab_id in seen or panel is None:
+            continue
+        # a panel that holds other tab panels (SHOWTIMES) is not a date
+        if panel.find(id=TAB_ID_RE):
+            continue
+        seen.add(tab_id)
+
+        movies = []
+        for card in panel.select(".col-md-3[style*='min-height']"):
+            img = card.select_one("img#samloadimage")
+            branches = []
+            for branch in card.select(".sambranchbg"):
+                divs = branch.parent.find_all("div", recursive=False) if branch.parent else []
+                block = divs[1] if len(divs) > 1 else None
+                branches.append({
+                    "name": _text(branch),
+                    "times": [_text(t) for t in block.find_all("a")] if block else [],
+                })
+            movies.append({
+                "title": _text(card.select_one(".col-10.text-excerpt")),
+                "format": _text(card.select_one(".col-2.text-excerpt")),
+                "poster": urljoin(BASE_URL, img["src"]) if img and img.get("src") else None,
+                "branches": branches,
+            })
 
-    results = []
+        tabs.append({"id": tab_id, "label": _text(a), "movies": movies})
 
-    # 4️⃣ Loop through date tabs
-    for tab in tab_buttons:
-        tab_label = tab.text.strip()
-        tab_id = tab.get_attribute("href").split("#")[-1]
+    if not any(t for tab in tabs for m in tab["movies"] for b in m["branches"] for t in b["times"]):
+        raise StaticParseError(f"no showtimes in {len(tabs)} tabs")
+    empty = [tab["label"] or tab["id"] for tab in tabs if not tab["movies"]]
+    if empty:
+        raise StaticParseError(f"no movies in date tab(s) {', '.join(empty)}")
+    return tabs
 
-        print(f"\n📅 Scraping Date: {tab_label} ({tab_id})")
 
-        driver.execute_script("arguments[0].click();", tab)
-        time.sleep(2)
+def fetch_static_tabs(session=None):
+    """Date tabs from the page fetched without a browser (see static_tabs)."""
+    r = (session or make_session(HEADERS)).get(BASE_URL, timeout=20)
+    r.raise_for_status()
+    return static_tabs(r.text)
 
-        # movie cards are inside #tab_X
-        movie_cards = driver.find_elements(
-            By.CSS_SELECTOR,
-            f"#{tab_id} .col-md-3[style*='min-height']"
-        )
-        print(f"  🎬 Found {len(movie_cards)} movies")
-
-        for card in movie_cards:
-
-            try:
-                movie_format = card.find_element(By.CSS_SELECTOR, ".col-2.text-excerpt").text.strip()
-            except:
-                movie_format = None
-
-            movie_title = card.find_element(By.CSS_SELECTOR, ".col-10.text-excerpt").text.strip()
-
-            try:
-                poster = card.find_element(By.CSS_SELECTOR, "img#samloadimage").get_attribute("src")
-            except:
-                poster = None
-
-            # find existing movie entry or create new
-            movie_entry = next((m for m in results if m["movie_title"] == movie_title), None)
-
-            if not movie_entry:
-                movie_entry = {
-                    "booking_link": BASE_URL,
-                    "movie_title": movie_title,
-                    "poster": poster,
-                    "format": movie_format,
-                    "dates": []
-                }
-                results.append(movie_entry)
-
-            date_entry = {
-                "date_label": parse_real_date(tab_label),
-                "cinemas": []
-            }
-
-            # 5️⃣ cinema branches & times
-            branches = card.find_elements(By.CSS_SELECTOR, ".sambranchbg")
-
-            for branch in branches:
-                branch_name = branch.text.strip()
-
-                time_block = branch.find_element(By.XPATH, "./../div[2]")
-                time_elements = time_block.find_elements(By.TAG_NAME, "a")
-
-                sessions = []
-
-                for a in time_elements:
-                    raw = a.text.strip()  # e.g. "20:40 H1"
-                    if not raw:
-                        continue
-
-                    parts = raw.split()
-                    time_str = parts[0]
-                    hall = parts[1] if len(parts) > 1 else None
-
-                    sessions.append({
-                        "version_label": movie_format,
-                        "hall": hall,
-                        "audio_language": None,
-                        "subtitle_language": None,
-                        "times": [time_str]
-                    })
-
-                date_entry["cinemas"].append({
-                    "cinema_name": f"Prime {branch_name}",
-                    "sessions": sessions
-                })
 
-            movie_entry["dates"].append(date_entry)
+def scrape_static(sink) -> bool:
+    """
+    Fetches the page without a browser and writes its showtimes. False
+    (nothing written) when the HTML cannot be used.
+    """
+    started = time.perf_counter()
+    try:
+        tabs = fetch_static_tabs()
+    except Exception as e:
+        print(f"⚠️ Static HTML unusable ({e})")
+        return False
+
+    print(f"📌 Found {len(tabs)} date tabs in the page HTML ({time.perf_counter() - started:.2f}s)")
+    write_tabs(sink, tabs)
+    print(f"\n🎞️ Prime Cineplex: {sink.count} showtimes")
+    return True
 
-    # 6️⃣ Save output
-    out = {
-        "base_url": BASE_URL,
-        "movies": results
-    }
 
-    with open("prime.json", "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=2, ensure_ascii=False)
+# -------------------------------------------------------
+# SELENIUM SCRAPE
+# -------------------------------------------------------
+def scrape_prime(sinks=("ndjson",), mode="auto"):
+    with open_sinks(sinks, PROVIDER_NAME, "prime", BASE_URL) as sink:
+        if mode != "browser":
+            if scrape_static(sink):
+                return
+            if mode == "static":
+                sink.close(complete=False)
+                return
+            print("🦊 Falling back to Firefox")
+        _scrape(sink)
 
-    print("\n✅ Saved to prime.json")
-    driver.quit()
+
+def _scrape(sink):
+    driver = make_driver()
+    try:
+        driver.get(BASE_URL)
+
+        # 1️⃣ Wait for the intro animation
+        if not wait_for_showtimes_button(driver):
+            sink.close(complete=False)
+            return
+
+        # 2️⃣ Click SHOWTIMES (tab 1)
+        try:
+            print("👉 Clicking SHOWTIMES tab...")
+            btn = driver.find_element(By.CSS_SELECTOR, "a[href='#tab_1']")
+            driver.execute_script("arguments[0].click();", btn)
+        except Exception as e:
+            print("❌ Failed to click SHOWTIMES:", e)
+            sink.close(complete=False)
+            return
+
+        # 3️⃣ FIND DATE TABS using the REAL selector
+        try:
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.ui-tabs-anchor[href^='#tab_']"))
+            )
+        except:
+            print("❌ ERROR: Date tabs did not load")
+            sink.close(complete=False)
+            return
+
+        # 4️⃣ Every date tab in one round trip
+        started = time.perf_counter()
+        tabs = extract_tabs(driver)
+        print(f"📌 Found {len(tabs)} date tabs ({(time.perf_counter() - started) * 1000:.0f} ms)")
+
+        # a panel filled in on click is opened and read on its own
+        write_tabs(sink, [tab if tab["movies"] else load_tab(driver, tab) for tab in tabs])
+
+        print(f"\n🎞️ Prime Cineplex: {sink.count} showtimes")
+    finally:
+        driver.quit()
+
+
+def load_tab(driver, tab, timeout=5):
+    driver.execute_script(
+        "document.querySelector(\"a.ui-tabs-anchor[href='#\" + arguments[0] + \"']\").click();",
+        tab["id"],
+    )
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, f"#{tab['id']} .col-md-3[style*='min-height']"))
+        )
+    except:
+        return tab  # the date really has no movies
+    return extract_tabs(driver, tab["id"])[0]
 
 
 if __name__ == "__main__":
-    scrape_prime()
+    parser = argparse.ArgumentParser(description="Scrape Prime Cineplex showtimes")
+    add_sink_argument(parser)
+    parser.add_argument("--mode", choices=MODES, default="auto",
+                        help="static HTML, the Firefox browser, or static with browser fallback (default)")
+    args = parser.parse_args()
+    scrape_prime(sink_kinds(args), mode=args.mode)
@@ -0,0 +1,156 @@
+# search.py
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+import crud
+from models import Movie
+
+# minimum score for /movies/search results
+MIN_SCORE = 0.3
+
+
+# -------------------------------------------------------
+# NORMALIZATION
+# -------------------------------------------------------
+def normalize(text: str) -> str:
+    """
+    Case-folds, drops Latin accents and turns punctuation into spaces.
+
+    Combining marks are only dropped after ASCII letters: Khmer vowel
+    signs are combining marks too and carry meaning.
+    """
+    out = []
+    prev = ""
+    for ch in unicodedata.normalize("NFKD", text.casefold()):
+        cat = unicodedata.category(ch)
+        if cat.startswith("M"):
+            if prev.isascii():
+                continue
+        elif not cat.startswith(("L", "N")):
+            ch = " "
+        out.append(ch)
+        prev = ch
+    return " ".join("".join(out).split())
+
+
+def trigrams(text: str, padded: bool = True) -> set:
+    grams = set()
+    for word in text.split():
+        if padded:
+            word = f"  {word} "
+        for i in range(len(word) - 2):
+            grams.add(word[i:i + 3])
+    return grams
+
+
+# -------------------------------------------------------
+# INDEX
+# -------------------------------------------------------
+class TitleIndex:
+    """
+    In-memory trigram index over movie titles.
+
+    `contains` replaces ILIKE '%x%' (which can never use an index);
+    `search` ranks typo-tolerant matches by trigram overlap, so
+    inconsistent Khmer/English transliterations still find the movie.
+    """
+
+    def __init__(self, titles: Dict[int, Tuple[str, int]]):
+        # movie id -> (normalized title, provider id)
+        self.titles = {}
+        self.grams = {}
+        self.postings = defaultdict(set)
+
+        for movie_id, (title, provider_id) in titles.items():
+            norm = normalize(title)
+            grams = trigrams(norm)
+            self.titles[movie_id] = (norm, provider_id)
+            self.grams[movie_id] = grams
+            for g in grams:
+                self.postings[g].add(movie_id)
+
+    def _ids(self, provider_id: Optional[int]):
+        if provider_id is None:
+            return self.titles.keys()
+        return [i for i, (_, p) in self.titles.items() if p == provider_id]
+
+    def contains(self, query: str, provider_id: Optional[int] = None) -> List[int]:
+        """
+        Ids of movies whose normalized title contains the normalized query.
+        """
+        q = normalize(query)
+        if not q:
+            return sorted(self._ids(provider_id))
+
+        grams = trigrams(q, padded=False)
+        if grams:
+            candidates = set.intersection(*(self.postings.get(g, set()) for g in grams))
+        else:
+            candidates = self._ids(provider_id)
+
+        return sorted(
+            i for i in candidates
+            if q in self.titles[i][0]
+            and (provider_id is None or self.titles[i][1] == provider_id)
+        )
+
+    def search(self, query: str, limit: int = 20, provider_id: Optional[int] = None,
+               min_score: float = MIN_SCORE) -> List[Tuple[int, float]]:
+        """
+        Ranked (movie id, score) pairs, best first. Scores are in [0, 2];
+        substring matches score above 1.
+        """
+        q = normalize(query)
+        qgrams = trigrams(q)
+        if not qgrams:
+            return []
+
+        shared = defaultdict(int)
+        for g in qgrams:
+            for i in self.postings.get(g, ()):
+                shared[i] += 1
+
+        hits = []
+        for i, n in shared.items():
+            norm, p = self.titles[i]
+            if provider_id is not None and p != provider_id:
+                continue
+
+            # share of the query found in the title, blended with
+            # pg_trgm-style similarity so shorter titles win ties
+            word_sim = n / len(qgrams)
+            similarity = n / (len(qgrams) + len(self.grams[i]) - n)
+            score = (word_sim + similarity) / 2
+            if q in norm:
+                score += 1.0
+
+            if score >= min_score:
+                hits.append((i, round(score, 4)))
+
+        hits.sort(key=lambda h: (-h[1], h[0]))
+        return hits[:limit]
+
+
+# -------------------------------------------------------
+# PER-GENERATION SINGLETON
+# -------------------------------------------------------
+_index: Optional[TitleIndex] = None
+_index_generation = None
+
+
+async def title_index(db) -> TitleIndex:
+    """
+    The index for the current data generation, rebuilt after each seed.
+    """
+    global _index, _index_generation
+
+    generation = await crud.fetch_generation(db)
+    if _index is None or generation != _index_generation:
+        rows = await crud.fetch_rows(db, select(Movie.id, Movie.title, Movie.provider_id))
+        _index = TitleIndex({movie_id: (title, provider_id) for movie_id, title, provider_id in rows})
+        _index_generation = generation
+
+    return _index
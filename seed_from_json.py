@@ -1,8 +1,10 @@
 # seed_from_json.py
+import argparse
 import json
-import re
-from urllib.parse import urlparse, parse_qs, unquote
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import AbstractSet, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 import os
 
 from database import SessionLocal, engine, Base
@@ -13,7 +15,14 @@ from crud import (
     get_or_create_movie,
     create_showtime_if_not_exists,
     create_booking_link_if_not_exists,
+    bump_generation,
 )
+from bulk_seed import BulkSeeder
+import fingerprints
+from fingerprints import FILE_SCOPE, movie_scope
+from records import IncompleteRecords, ShowtimeRecord, flatten, read_records
+from seed_profile import NULL_PROFILER, SeedProfiler
+from shadow_seed import ShadowDatabase, MIN_RATIO
 
 # -------------------------------------------------------
 # RESET DATABASE (DROP EVERYTHING)
@@ -29,54 +38,187 @@ def reset_database():
 
 
 # -------------------------------------------------------
-# TIME PARSING HELPERS
+# NORMALIZED ROWS (one per showtime)
 # -------------------------------------------------------
-def parse_time_str(text: str):
-    m = re.search(r"(\d{1,2}:\d{2})(?:\s*(AM|PM|am|pm))?", text)
-    if not m:
-        return None
-
-    hhmm = m.group(1)
-    ampm = m.group(2)
-
-    try:
-        if ampm:
-            return datetime.strptime(f"{hhmm} {ampm}", "%I:%M %p").time()
-        return datetime.strptime(hhmm, "%H:%M").time()
-    except:
-        return None
-
-
-def parse_date(date_str: str):
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except:
-        return None
-
+class SeedRow(NamedTuple):
+    movie_external_id: str
+    movie_title: str
+    cinema_name: str
+    start_time: datetime
+    version_label: Optional[str]
+    hall_type: Optional[str]
+    audio_language: Optional[str]
+    subtitle_language: Optional[str]
+    booking_url: Optional[str]
+
+
+def movie_external_id(provider_name: str, title: Optional[str]) -> str:
+    # ✅ provider-scoped movie ID
+    return f"{provider_name}:{title or 'Unknown'}"
+
+
+def seed_row(provider_name: str, record: ShowtimeRecord) -> SeedRow:
+    return SeedRow(
+        movie_external_id(provider_name, record.movie_title),
+        record.movie_title,
+        record.cinema_name,
+        record.start_time,
+        record.version_label,
+        record.hall,
+        record.audio_language,
+        record.subtitle_language,
+        record.url,
+    )
 
-def parse_showdate_from_url(href: str):
-    if not href:
-        return None
 
-    parsed = urlparse(href)
-    q = parse_qs(parsed.query)
+def iter_rows(data: dict, provider_name: str, skip: AbstractSet[str] = frozenset()) -> Iterator[SeedRow]:
+    """
+    Flattens a scraper document (Prime, Legend or Major layout)
+    into one SeedRow per showtime, leaving out movies in `skip`.
+    """
+    for m in data.get("movies", []):
+        movie = {**m, "movie_title": m.get("movie_title") or m.get("title")}
+        if skip and movie_external_id(provider_name, movie["movie_title"]) in skip:
+            continue
 
-    if "ShowDate" in q:
-        raw = unquote(q["ShowDate"][0])
-        for fmt in ("%d-%b-%Y %I:%M:%S %p", "%d-%b-%Y %I:%M %p"):
-            try:
-                return datetime.strptime(raw, fmt)
-            except:
-                continue
+        for date_entry in m.get("dates", []):
+            for r in flatten(movie, date_entry):
+                record = ShowtimeRecord.from_dict(r)
+                if record:
+                    yield seed_row(provider_name, record)
+
+
+def iter_record_rows(records: Iterable[dict], provider_name: str,
+                     skip: AbstractSet[str] = frozenset()) -> Iterator[SeedRow]:
+    """
+    SeedRows from line-delimited records (see records.py).
+    """
+    for r in records:
+        if skip and movie_external_id(provider_name, r.get("movie_title")) in skip:
+            continue
+
+        record = ShowtimeRecord.from_dict(r)
+        if record:
+            yield seed_row(provider_name, record)
+
+
+def load_rows(file_path: str, provider_name: str, follow: bool = False,
+              skip: AbstractSet[str] = frozenset()) -> Iterator[SeedRow]:
+    """
+    Streams .ndjson record files (optionally following a scraper that is
+    still writing); loads legacy .json documents whole.
+    """
+    if file_path.endswith(".ndjson"):
+        return iter_record_rows(read_records(file_path, follow=follow), provider_name, skip)
 
-    return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return iter_rows(data, provider_name, skip)
+
+
+def movie_digests(file_path: str, provider_name: str) -> Dict[str, str]:
+    """
+    movie external_id -> hash of its records, in file order
+    (a separate pass over the file; see fingerprints.py).
+    """
+    hashes = {}
+
+    def add(record):
+        ext = movie_external_id(provider_name, record.get("movie_title"))
+        h = hashes.get(ext)
+        if h is None:
+            h = hashes[ext] = fingerprints.new_hash()
+        fingerprints.update_record(h, record)
+
+    if file_path.endswith(".ndjson"):
+        for record in read_records(file_path):
+            add(record)
+    else:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for m in data.get("movies", []):
+            movie = {**m, "movie_title": m.get("movie_title") or m.get("title")}
+            for date_entry in m.get("dates", []):
+                for record in flatten(movie, date_entry):
+                    add(record)
+
+    return {ext: h.hexdigest() for ext, h in hashes.items()}
 
 
 # -------------------------------------------------------
 # SEEDER (NOW SUPPORTS PRIME, LEGEND, MAJOR)
 # -------------------------------------------------------
-def seed_file(file_path: str, provider_name: str):
+def seed_file(file_path: str, provider_name: str, batch_size: int = 1000, session_factory=SessionLocal,
+              follow: bool = False, use_fingerprints: bool = True, profiler=NULL_PROFILER):
+    """
+    Batched, diff-based ingestion (see bulk_seed.py): only the inserts,
+    updates and deletes needed to match the file are applied, in one
+    transaction per provider, so ids stay stable between runs.
+
+    With `use_fingerprints`, a file identical to the last seed is skipped
+    (returns None) and movies whose records are unchanged are kept without
+    being re-read. Follow mode cannot hash ahead of the scraper, so it
+    seeds in full and clears the provider's fingerprints.
+    """
     print(f"🌱 Seeding {file_path} ({provider_name})")
+    started = time.perf_counter()
+    use_fingerprints = use_fingerprints and not follow
+
+    db = session_factory()
+    try:
+        digests, unchanged = {}, set()
+        if use_fingerprints:
+            with profiler.stage("fingerprint file"):
+                known = fingerprints.load(db, provider_name)
+                digests[FILE_SCOPE] = fingerprints.file_digest(file_path)
+            if known.get(FILE_SCOPE) == digests[FILE_SCOPE]:
+                print(f"⏭️ {provider_name} unchanged since the last seed, skipped\n")
+                return None
+
+            with profiler.stage("fingerprint movies"):
+                for ext, digest in movie_digests(file_path, provider_name).items():
+                    digests[movie_scope(ext)] = digest
+                    if known.get(movie_scope(ext)) == digest:
+                        unchanged.add(ext)
+
+        seeder = BulkSeeder(db, provider_name, batch_size=batch_size, profiler=profiler)
+        with profiler.stage("keep unchanged movies"):
+            unchanged = {ext for ext in unchanged if seeder.keep_movie(ext)}
+
+        with profiler.stage("open file"):
+            rows = load_rows(file_path, provider_name, follow=follow, skip=unchanged)
+        # flushes inside add() are timed by the seeder's own stages
+        for row in profiler.iterate("parse rows", rows):
+            seeder.add(row)
+
+        with profiler.stage("save fingerprints"):
+            if use_fingerprints:
+                fingerprints.save(db, seeder.provider_id, digests)
+            else:
+                fingerprints.clear(db, seeder.provider_id)
+        counts = seeder.finish()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"   {seeder.summary()}")
+    if unchanged:
+        print(f"   {len(unchanged)} unchanged movies kept without re-reading")
+    print(
+        f"✅ Finished seeding {provider_name}: {counts['rows']} rows in {elapsed:.2f}s "
+        f"({counts['rows'] / elapsed if elapsed else 0:.0f} rows/s)\n"
+    )
+    return seeder.changes
+
+
+def seed_file_legacy(file_path: str, provider_name: str, profiler=NULL_PROFILER):
+    """
+    Original per-row get-or-create seeder (a SELECT, INSERT, commit and
+    refresh per entity). Kept for `--legacy` and benchmark.py seed.
+    """
+    print(f"🌱 Seeding {file_path} ({provider_name}) [legacy]")
+    started = time.perf_counter()
+    rows = 0
 
     db = SessionLocal()
 
@@ -85,101 +227,219 @@ def seed_file(file_path: str, provider_name: str):
         provider_name,
         website_url=None
     )
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for m in data.get("movies", []):
-        title = m.get("movie_title") or m.get("title") or "Unknown"
-
-        # ✅ provider-scoped movie ID
-        movie = get_or_create_movie(
-            db,
-            provider,
-            external_id=f"{provider_name}:{title}",
-            title=title
-        )
-
-        for date_entry in m.get("dates", []):
-            date_label = date_entry.get("date_label")
-
-            show_date = parse_date(date_label) or datetime.now().date()
-
-            for c in date_entry.get("cinemas", []):
-                cinema_name = c.get("cinema_name")
-
-                cinema = get_or_create_cinema(
+    # this path does not hash, so the next batched seed must not skip anything
+    fingerprints.clear(db, provider.id)
+
+    with profiler.stage("open file"):
+        source = load_rows(file_path, provider_name)
+
+    for row in profiler.iterate("parse rows", source):
+        rows += 1
+
+        with profiler.stage("get_or_create movie"):
+            movie = get_or_create_movie(
+                db,
+                provider,
+                external_id=row.movie_external_id,
+                title=row.movie_title
+            )
+
+        with profiler.stage("get_or_create cinema"):
+            cinema = get_or_create_cinema(
+                db,
+                provider,
+                external_id=row.cinema_name,
+                name=row.cinema_name
+            )
+
+        with profiler.stage("create showtime"):
+            showtime = create_showtime_if_not_exists(
+                db,
+                cinema=cinema,
+                movie=movie,
+                start_time=row.start_time,
+                version_label=row.version_label,
+                hall_type=row.hall_type,
+                audio_language=row.audio_language,
+                subtitle_language=row.subtitle_language
+            )
+
+        if row.booking_url:
+            with profiler.stage("create booking link"):
+                create_booking_link_if_not_exists(
                     db,
-                    provider,
-                    external_id=cinema_name,
-                    name=cinema_name
+                    showtime,
+                    row.booking_url
                 )
 
-                for sess in c.get("sessions", []):
-                    version = sess.get("version_label")
-                    hall = sess.get("hall")
-                    audio = sess.get("audio_language")
-                    sub = sess.get("subtitle_language")
-
-                    for t in sess.get("times", []):
-                        if isinstance(t, dict):
-                            time_str = t.get("time")
-                            booking_url = t.get("url")
-                        else:
-                            time_str = t
-                            booking_url = None  # Major & Prime
-
-                        dt = None
-                        if booking_url:
-                            dt = parse_showdate_from_url(booking_url)
-
-                        if not dt:
-                            time_val = parse_time_str(time_str)
-                            if not time_val:
-                                continue
-                            dt = datetime.combine(show_date, time_val)
-
-                        showtime = create_showtime_if_not_exists(
-                            db,
-                            cinema=cinema,
-                            movie=movie,
-                            start_time=dt,
-                            version_label=version,
-                            hall_type=hall,
-                            audio_language=audio,
-                            subtitle_language=sub
-                        )
-
-                        if booking_url:
-                            create_booking_link_if_not_exists(
-                                db,
-                                showtime,
-                                booking_url
-                            )
+    # invalidate the API's response cache
+    with profiler.stage("commit"):
+        bump_generation(db)
 
     db.close()
-    print(f"✅ Finished seeding {provider_name}\n")
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Finished seeding {provider_name}: {rows} rows in {elapsed:.2f}s "
+        f"({rows / elapsed if elapsed else 0:.0f} rows/s)\n"
+    )
 
 
 # -------------------------------------------------------
-# MAIN
+# PARALLEL PROVIDERS
 # -------------------------------------------------------
-if __name__ == "__main__":
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-
-    prime_path = os.path.join(base_dir, "prime.json")
-    legend_path = os.path.join(base_dir, "legend.json")
-    major_path = os.path.join(base_dir, "major.json")
-
-    reset_database()
-
-    if os.path.exists(prime_path):
-        seed_file(prime_path, "Prime Cineplex")
+def prepare_providers(session_factory, provider_names: Iterable[str]):
+    """
+    Creates the providers and the data generation row one at a time before
+    any job starts. Parallel jobs then only reference these rows, so they
+    never race to insert them; each job's only shared write is the
+    generation bump, made last, just before its commit.
+    """
+    db = session_factory()
+    try:
+        for name in provider_names:
+            create_provider_if_not_exists(db, name, website_url=None)
+        if db.get(models.DataGeneration, 1) is None:
+            bump_generation(db)
+    finally:
+        db.close()
+
+
+def seed_sources(sources: List[Tuple[str, str]], jobs: int, seed_one) -> List[Tuple[str, float, str]]:
+    """
+    Runs `seed_one(path, provider_name)` for every (path, provider) with up
+    to `jobs` threads; each call opens its own session and transaction.
+    Returns (provider, seconds, status) in source order and raises the first
+    error once every job has finished.
+    """
+    def run(path, provider_name):
+        started = time.perf_counter()
+        try:
+            status = seed_one(path, provider_name)
+        except IncompleteRecords as e:
+            # rolled back: the provider keeps its current data
+            print(f"⚠️ Skipping {provider_name}: {e}")
+            status = "skipped (incomplete)"
+        return provider_name, time.perf_counter() - started, status
+
+    if jobs <= 1:
+        return [run(path, provider_name) for path, provider_name in sources]
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="seed") as pool:
+        futures = [pool.submit(run, path, provider_name) for path, provider_name in sources]
+
+    results, errors = [], []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
 
-    if os.path.exists(legend_path):
-        seed_file(legend_path, "Legend Cinema")
 
-    if os.path.exists(major_path):
-        seed_file(major_path, "Major Cineplex")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the database with scraper JSON files")
+    parser.add_argument("--dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="directory holding prime.json / legend.json / major.json")
+    parser.add_argument("--legacy", action="store_true", help="use the per-row get-or-create seeder")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--follow", action="store_true",
+                        help="seed <provider>.ndjson files while the scrapers are still writing them")
+    parser.add_argument("--no-fingerprints", action="store_true",
+                        help="re-read every movie even if its content hash is unchanged")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop and recreate every table first (new ids, empty API while seeding)")
+    parser.add_argument("--shadow", action="store_true",
+                        help="seed a shadow copy, verify it and swap it in atomically")
+    parser.add_argument("--min-ratio", type=float, default=MIN_RATIO,
+                        help="with --shadow: minimum shadow/live showtime ratio to accept")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="seed up to N providers at the same time (not on SQLite)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print time per stage and database round trips per table")
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="with --profile: also write a cProfile file (e.g. seed.prof)")
+    args = parser.parse_args()
+
+    if args.profile_out:
+        args.profile = True
+    profiler = SeedProfiler(args.profile_out) if args.profile else NULL_PROFILER
+
+    if args.shadow and args.legacy:
+        parser.error("--shadow works with the batched seeder only")
+
+    sources = [
+        ("prime", "Prime Cineplex"),
+        ("legend", "Legend Cinema"),
+        ("major", "Major Cineplex"),
+    ]
+
+    session_factory = SessionLocal
+    shadow = None
+
+    if args.shadow:
+        shadow = ShadowDatabase()
+        print("🌓 Building shadow dataset...")
+        session_factory = shadow.prepare(copy_live=not args.reset)
+    elif args.reset:
+        reset_database()
+    else:
+        Base.metadata.create_all(bind=engine)
+
+    files = []
+    for name, provider_name in sources:
+        # prefer the streamed record file over the legacy document
+        path = os.path.join(args.dir, f"{name}.ndjson")
+        if not (args.follow or os.path.exists(path)):
+            path = os.path.join(args.dir, f"{name}.json")
+            if not os.path.exists(path):
+                continue
+        files.append((path, provider_name))
+
+    jobs = max(1, min(args.jobs, len(files)))
+    if jobs > 1 and engine.dialect.name == "sqlite":
+        print("ℹ️ SQLite allows one writer at a time, seeding providers one by one.")
+        jobs = 1
+
+    def seed_one(path, provider_name):
+        if args.legacy:
+            seed_file_legacy(path, provider_name, profiler=profiler)
+            return "seeded"
+        changes = seed_file(path, provider_name, batch_size=args.batch_size,
+                            session_factory=session_factory, follow=args.follow,
+                            use_fingerprints=not args.no_fingerprints, profiler=profiler)
+        return "unchanged" if changes is None else "seeded"
+
+    started = time.perf_counter()
+    if args.profile:
+        profiler.start()
+    try:
+        if jobs > 1:
+            prepare_providers(session_factory, [provider_name for _, provider_name in files])
+        results = seed_sources(files, jobs, seed_one)
+        seeded = [provider_name for provider_name, _, status in results if not status.startswith("skipped")]
+
+        print(f"⏱️ {jobs} job(s):")
+        for provider_name, seconds, status in results:
+            print(f"   {provider_name:<16} {seconds:>7.2f}s  {status}")
+        print(f"   {'total':<16} {time.perf_counter() - started:>7.2f}s")
+
+        if shadow:
+            counts = shadow.verify(seeded, min_ratio=args.min_ratio)
+            print(f"🔍 Shadow verified: {counts}")
+    except Exception:
+        if shadow:
+            shadow.discard()
+            print("❌ Shadow discarded, live data untouched.")
+        raise
+    finally:
+        if args.profile:
+            profiler.stop()
+            print(profiler.report())
+
+    if shadow:
+        shadow.swap()
+        print("🔀 Shadow swapped in.")
 
     print("🎉 Seeding complete.")
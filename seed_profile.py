@@ -0,0 +1,160 @@
+# seed_profile.py
+"""
+Where seeding time goes: `seed_from_json.py --profile`.
+
+SeedProfiler records wall time and call counts per named stage
+(fingerprinting, parsing, lookups, per-table flushes, deletes, commit)
+and, through SQLAlchemy engine events, the round trips per table and
+statement kind, commits, and ORM refreshes per model. `--profile-out`
+additionally runs cProfile and writes a .prof file (python -m pstats,
+snakeviz).
+
+Code that is always instrumented takes a profiler argument that
+defaults to NULL_PROFILER, whose methods do nothing.
+"""
+import cProfile
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database import Base
+
+# statement kind and the table it touches first: UPDATE names its table
+# right away, the others after FROM / INTO
+_STATEMENT_RE = re.compile(
+    r"^\s*(?:(UPDATE)\s+[\"`]?(\w+)|(SELECT|INSERT|DELETE)\b.*?\b(?:FROM|INTO)\s+[\"`]?(\w+))",
+    re.IGNORECASE | re.DOTALL,
+)
+_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+class NullProfiler:
+    def stage(self, name: str):
+        return nullcontext()
+
+    def iterate(self, name: str, items: Iterable) -> Iterable:
+        return items
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class SeedProfiler:
+    def __init__(self, profile_out: Optional[str] = None):
+        self.profile_out = profile_out
+        self._lock = threading.Lock()
+        # stage -> [seconds, calls]
+        self.stages = defaultdict(lambda: [0.0, 0])
+        # table -> kind -> [round trips, seconds]
+        self.statements = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+        self.refreshes = defaultdict(int)
+        self.commits = 0
+        self._cprofile = None
+        self._started = None
+        self.wall = 0.0
+
+    # ---------------------------------------------------
+    # STAGES
+    # ---------------------------------------------------
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_stage(name, time.perf_counter() - started, 1)
+
+    def iterate(self, name: str, items: Iterable) -> Iterator:
+        """Yields from `items`, timing only the work of producing each item."""
+        it = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self._add_stage(name, time.perf_counter() - started, 0)
+                return
+            self._add_stage(name, time.perf_counter() - started, 1)
+            yield item
+
+    def _add_stage(self, name, seconds, calls):
+        with self._lock:
+            entry = self.stages[name]
+            entry[0] += seconds
+            entry[1] += calls
+
+    # ---------------------------------------------------
+    # SQLALCHEMY EVENTS
+    # ---------------------------------------------------
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["seed_profile_started"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info.pop("seed_profile_started", time.perf_counter())
+        m = _STATEMENT_RE.match(statement)
+        kind, table = ((m.group(1) or m.group(3)).upper(), m.group(2) or m.group(4)) if m else ("OTHER", "-")
+        with self._lock:
+            entry = self.statements[table][kind]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def _on_commit(self, conn):
+        with self._lock:
+            self.commits += 1
+
+    def _on_refresh(self, target, context, attrs):
+        with self._lock:
+            self.refreshes[type(target).__name__] += 1
+
+    def start(self):
+        event.listen(Engine, "before_cursor_execute", self._before_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_execute)
+        event.listen(Engine, "commit", self._on_commit)
+        event.listen(Base, "refresh", self._on_refresh, propagate=True)
+        if self.profile_out:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self._started
+        if self._cprofile:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.profile_out)
+        event.remove(Engine, "before_cursor_execute", self._before_execute)
+        event.remove(Engine, "after_cursor_execute", self._after_execute)
+        event.remove(Engine, "commit", self._on_commit)
+        event.remove(Base, "refresh", self._on_refresh)
+
+    # ---------------------------------------------------
+    # REPORT
+    # ---------------------------------------------------
+    def report(self) -> str:
+        lines = ["📊 Seeding profile", f"{'stage':<28} {'calls':>9} {'seconds':>9}"]
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda i: -i[1][0]):
+            lines.append(f"{name:<28} {calls:>9} {seconds:>9.3f}")
+
+        lines.append("")
+        lines.append(f"{'table':<20}" + "".join(f"{k:>9}" for k in _KINDS) + f"{'other':>9}{'db s':>9}")
+        total_trips, total_db = 0, 0.0
+        for table, kinds in sorted(self.statements.items()):
+            trips = [kinds[k][0] if k in kinds else 0 for k in _KINDS]
+            other = sum(v[0] for k, v in kinds.items() if k not in _KINDS)
+            seconds = sum(v[1] for v in kinds.values())
+            total_trips += sum(trips) + other
+            total_db += seconds
+            lines.append(f"{table:<20}" + "".join(f"{t:>9}" for t in trips) + f"{other:>9}{seconds:>9.3f}")
+
+        refreshes = ", ".join(f"{name} {n}" for name, n in sorted(self.refreshes.items())) or "0"
+        lines.append("")
+        lines.append(f"round trips {total_trips}  db time {total_db:.3f}s  commits {self.commits}  "
+                     f"refreshes {refreshes}  wall {self.wall:.3f}s")
+        if self.profile_out:
+            lines.append(f"cProfile written to {self.profile_out} (python -m pstats {self.profile_out})")
+        return "\n".join(lines)
@@ -0,0 +1,181 @@
+# shadow_seed.py
+"""
+Blue-green seeding.
+
+The seeder writes a complete new dataset next to the live one (a
+separate schema on Postgres, a separate file on SQLite), checks the row
+counts and then switches readers over in one atomic step:
+
+- Postgres: in one transaction the live app tables are dropped and the
+            shadow's moved into the live schema; nothing else in that
+            schema (extensions, other tables, views, grants) is touched
+- SQLite:   the shadow file replaces the live file with os.replace();
+            the API reopens connections when the file changes (see database.py)
+
+The API never sees partially seeded tables and never waits on the writer.
+"""
+import os
+import sqlite3
+from typing import Dict, Iterable
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, engine as live_engine
+from models import Provider, Cinema, Showtime
+
+SHADOW_SCHEMA = os.getenv("SHADOW_SCHEMA", "cinema_shadow")
+LIVE_SCHEMA = os.getenv("LIVE_SCHEMA", "public")
+# shadow showtimes must be at least this share of the live ones
+MIN_RATIO = float(os.getenv("SHADOW_MIN_RATIO", "0.5"))
+
+
+class ShadowVerificationError(RuntimeError):
+    pass
+
+
+class ShadowDatabase:
+    def __init__(self, engine=live_engine):
+        self.live = engine
+        self.dialect = engine.dialect.name
+
+        if self.dialect == "sqlite":
+            self.live_path = engine.url.database
+            if not self.live_path or self.live_path == ":memory:":
+                raise ValueError("shadow seeding needs a file-backed SQLite database")
+            self.shadow_path = self.live_path + ".shadow"
+            self.shadow = create_engine(engine.url.set(database=self.shadow_path))
+        elif self.dialect == "postgresql":
+            self.shadow = engine.execution_options(schema_translate_map={None: SHADOW_SCHEMA})
+        else:
+            raise ValueError(f"shadow seeding is not supported on {self.dialect}")
+
+    # ---------------------------------------------------
+    # BUILD
+    # ---------------------------------------------------
+    def prepare(self, copy_live: bool = True) -> sessionmaker:
+        """
+        Creates an empty shadow, optionally filled with the live data so the
+        diff seeder keeps ids stable. Returns a session factory bound to it.
+        """
+        self.discard()
+
+        if self.dialect == "sqlite":
+            if copy_live and os.path.exists(self.live_path):
+                src = sqlite3.connect(self.live_path)
+                dst = sqlite3.connect(self.shadow_path)
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+                    src.close()
+            Base.metadata.create_all(bind=self.shadow)
+        else:
+            with self.live.begin() as conn:
+                conn.execute(text(f'CREATE SCHEMA "{SHADOW_SCHEMA}"'))
+            Base.metadata.create_all(bind=self.shadow)
+            if copy_live:
+                self._copy_postgres()
+
+        return sessionmaker(autocommit=False, autoflush=False, bind=self.shadow)
+
+    def _copy_postgres(self):
+        with self.live.begin() as conn:
+            live_tables = set(conn.execute(
+                text("SELECT table_name FROM information_schema.tables WHERE table_schema = :s"),
+                {"s": LIVE_SCHEMA},
+            ).scalars())
+
+            for table in Base.metadata.sorted_tables:
+                if table.name not in live_tables:
+                    continue
+                cols = ", ".join(f'"{c.name}"' for c in table.columns)
+                conn.execute(text(
+                    f'INSERT INTO "{SHADOW_SCHEMA}"."{table.name}" ({cols}) '
+                    f'SELECT {cols} FROM "{LIVE_SCHEMA}"."{table.name}"'
+                ))
+                if "id" in table.columns and table.columns["id"].autoincrement is not False:
+                    conn.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('\"{SHADOW_SCHEMA}\".\"{table.name}\"', 'id'), "
+                        f'COALESCE((SELECT MAX(id) FROM "{SHADOW_SCHEMA}"."{table.name}"), 0) + 1, false)'
+                    ))
+
+    # ---------------------------------------------------
+    # VERIFY
+    # ---------------------------------------------------
+    def counts(self, bind) -> Dict[str, int]:
+        with bind.connect() as conn:
+            out = {}
+            for table in Base.metadata.sorted_tables:
+                try:
+                    out[table.name] = conn.execute(select(func.count()).select_from(table)).scalar()
+                except Exception:
+                    conn.rollback()
+                    out[table.name] = 0
+            return out
+
+    def showtimes_per_provider(self, bind) -> Dict[str, int]:
+        with bind.connect() as conn:
+            return dict(conn.execute(
+                select(Provider.name, func.count(Showtime.id))
+                .join(Cinema, Cinema.provider_id == Provider.id)
+                .join(Showtime, Showtime.cinema_id == Cinema.id)
+                .group_by(Provider.name)
+            ).all())
+
+    def verify(self, providers: Iterable[str], min_ratio: float = MIN_RATIO) -> Dict[str, int]:
+        """
+        Every seeded provider must have showtimes, and the shadow must hold
+        at least `min_ratio` of the live showtimes. Returns shadow counts.
+        """
+        shadow_counts = self.counts(self.shadow)
+        live_counts = self.counts(self.live)
+        per_provider = self.showtimes_per_provider(self.shadow)
+
+        empty = [p for p in providers if not per_provider.get(p)]
+        if empty:
+            raise ShadowVerificationError(f"no showtimes for {', '.join(empty)}")
+
+        live = live_counts.get("showtimes", 0)
+        if live and shadow_counts["showtimes"] < live * min_ratio:
+            raise ShadowVerificationError(
+                f"shadow has {shadow_counts['showtimes']} showtimes, live has {live} "
+                f"(minimum ratio {min_ratio})"
+            )
+
+        return shadow_counts
+
+    # ---------------------------------------------------
+    # SWAP / DISCARD
+    # ---------------------------------------------------
+    def swap(self):
+        if self.dialect == "sqlite":
+            self.shadow.dispose()
+            os.replace(self.shadow_path, self.live_path)
+            # this process's own pooled connections still point at the old file
+            self.live.dispose()
+            return
+
+        # only the app's own tables change hands; the live schema itself is
+        # neither renamed nor dropped, so no schema ownership is needed. A
+        # view or foreign key on the live tables fails the drop and rolls
+        # the whole swap back instead of being dropped with them.
+        tables = Base.metadata.sorted_tables
+        with self.live.begin() as conn:
+            for table in reversed(tables):
+                conn.execute(text(f'DROP TABLE IF EXISTS "{LIVE_SCHEMA}"."{table.name}"'))
+            # indexes and serial sequences move with their table
+            for table in tables:
+                conn.execute(text(f'ALTER TABLE "{SHADOW_SCHEMA}"."{table.name}" SET SCHEMA "{LIVE_SCHEMA}"'))
+            conn.execute(text(f'DROP SCHEMA "{SHADOW_SCHEMA}"'))
+        self.live.dispose()
+
+    def discard(self):
+        if self.dialect == "sqlite":
+            self.shadow.dispose()
+            for suffix in ("", "-journal", "-wal", "-shm"):
+                if os.path.exists(self.shadow_path + suffix):
+                    os.remove(self.shadow_path + suffix)
+        else:
+            with self.live.begin() as conn:
+                conn.execute(text(f'DROP SCHEMA IF EXISTS "{SHADOW_SCHEMA}" CASCADE'))
@@ -0,0 +1,230 @@
+# sinks.py
+"""
+Where scrapers send their ShowtimeRecords (records.py).
+
+    db      batches records straight into the database with BulkSeeder,
+            committed when the scrape finishes; no files in between
+    ndjson  <name>.ndjson, one record per line, for seed_from_json.py
+    json    the legacy nested <name>.json document
+
+Scrapers take `--sink` (repeatable) and write to every sink named:
+
+    with open_sinks(["db", "ndjson"], "Major Cineplex", "major", BASE_URL) as sink:
+        sink.write(record)
+
+A scrape that raises, or calls close(complete=False), leaves the
+database as it was and marks the .ndjson file incomplete.
+"""
+import argparse
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from records import NdjsonWriter, ShowtimeRecord
+
+SINK_CHOICES = ("db", "ndjson", "json")
+
+
+class Sink(ABC):
+    @abstractmethod
+    def write(self, record: ShowtimeRecord):
+        ...
+
+    def close(self, complete: bool = True):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+        return False
+
+
+# -------------------------------------------------------
+# DATABASE
+# -------------------------------------------------------
+class DatabaseSink(Sink):
+    """
+    Feeds records to a BulkSeeder as they arrive. The provider is synced
+    in one transaction: rows the scrape did not produce are deleted when
+    it completes, and nothing is committed if it does not.
+    """
+
+    def __init__(self, provider_name: str, batch_size: int = 1000, session_factory=None):
+        # the seeder's imports open the database; file-only scrapes do not need them
+        import fingerprints
+        from bulk_seed import BulkSeeder
+        from database import Base, SessionLocal, engine
+        from seed_from_json import seed_row
+
+        Base.metadata.create_all(bind=engine)
+
+        self._fingerprints = fingerprints
+        self._seed_row = seed_row
+        self.provider_name = provider_name
+        self.started = time.perf_counter()
+        self.db = (session_factory or SessionLocal)()
+        self.seeder = BulkSeeder(self.db, provider_name, batch_size=batch_size)
+        self.closed = False
+
+    def write(self, record: ShowtimeRecord):
+        self.seeder.add(self._seed_row(self.provider_name, record))
+
+    def close(self, complete: bool = True):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if not complete:
+                self.db.rollback()
+                print(f"⚠️ {self.provider_name}: scrape did not finish, database left unchanged")
+                return
+
+            # nothing was hashed, so the next file-based seed must not skip anything
+            self._fingerprints.clear(self.db, self.seeder.provider_id)
+            counts = self.seeder.finish()
+        finally:
+            self.db.close()
+
+        elapsed = time.perf_counter() - self.started
+        print(f"   {self.seeder.summary()}")
+        print(f"✅ Seeded {self.provider_name}: {counts['rows']} rows in {elapsed:.2f}s")
+
+
+# -------------------------------------------------------
+# FILES
+# -------------------------------------------------------
+class NdjsonSink(Sink):
+    def __init__(self, path: str):
+        self.writer = NdjsonWriter(path)
+
+    def write(self, record: ShowtimeRecord):
+        self.writer.write(record.to_dict())
+
+    def close(self, complete: bool = True):
+        if self.writer.closed:
+            return
+        self.writer.close(complete=complete)
+        if complete:
+            print(f"✅ Saved {self.writer.path} | Showtimes: {self.writer.count}")
+
+
+class JsonSink(Sink):
+    """
+    Collects records into the nested movie -> dates -> cinemas -> sessions
+    document and writes it on a complete close.
+    """
+
+    def __init__(self, path: str, base_url: str):
+        self.path = path
+        self.base_url = base_url
+        self.movies: Dict[str, dict] = {}
+        self.closed = False
+
+    def write(self, record: ShowtimeRecord):
+        movie = self.movies.setdefault(record.movie_title, {
+            "booking_link": self.base_url,
+            "movie_title": record.movie_title,
+            "poster": record.poster,
+            "format": record.format,
+            "dates": {},
+        })
+        cinema = movie["dates"].setdefault(record.start_time.date().isoformat(), {}) \
+            .setdefault(record.cinema_name, {})
+        session = cinema.setdefault(
+            (record.version_label, record.hall, record.audio_language, record.subtitle_language),
+            {
+                "version_label": record.version_label,
+                "hall": record.hall,
+                "audio_language": record.audio_language,
+                "subtitle_language": record.subtitle_language,
+                "times": [],
+            },
+        )
+
+        time_str = record.start_time.strftime("%H:%M")
+        entry = {"time": time_str, "url": record.url} if record.url else time_str
+        if entry not in session["times"]:
+            session["times"].append(entry)
+
+    def close(self, complete: bool = True):
+        if self.closed:
+            return
+        self.closed = True
+        if not complete:
+            return
+
+        movies = [
+            {
+                **movie,
+                "dates": [
+                    {
+                        "date_label": date_label,
+                        "cinemas": [
+                            {"cinema_name": name, "sessions": list(sessions.values())}
+                            for name, sessions in cinemas.items()
+                        ],
+                    }
+                    for date_label, cinemas in movie["dates"].items()
+                ],
+            }
+            for movie in self.movies.values()
+        ]
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"base_url": self.base_url, "movies": movies}, f, indent=2, ensure_ascii=False)
+
+        print(f"✅ Saved {self.path} | Movies: {len(movies)}")
+
+
+# -------------------------------------------------------
+# FAN-OUT
+# -------------------------------------------------------
+class TeeSink(Sink):
+    def __init__(self, sinks: List[Sink]):
+        self.sinks = sinks
+        self.count = 0
+
+    def write(self, record: ShowtimeRecord):
+        self.count += 1
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self, complete: bool = True):
+        # every sink gets closed even if one of them fails
+        errors = []
+        for sink in self.sinks:
+            try:
+                sink.close(complete=complete)
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+
+def open_sinks(kinds: List[str], provider_name: str, name: str, base_url: str) -> TeeSink:
+    """`name` is the file stem: major -> major.ndjson / major.json."""
+    sinks = []
+    for kind in dict.fromkeys(kinds):
+        if kind == "db":
+            sinks.append(DatabaseSink(provider_name))
+        elif kind == "ndjson":
+            sinks.append(NdjsonSink(f"{name}.ndjson"))
+        elif kind == "json":
+            sinks.append(JsonSink(f"{name}.json", base_url))
+        else:
+            raise ValueError(f"unknown sink: {kind}")
+    return TeeSink(sinks)
+
+
+def add_sink_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--sink", action="append", choices=SINK_CHOICES,
+        help="where to send records (repeatable, default: ndjson)",
+    )
+
+
+def sink_kinds(args) -> List[str]:
+    return args.sink or ["ndjson"]
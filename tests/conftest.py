@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+
+import pytest
+
+# the modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    """
+    A file-backed SQLite DATABASE_URL with the app's tables. database.py
+    binds its engine on first import, so it is imported only once this is set.
+    """
+    directory = tmp_path_factory.mktemp("db")
+    url = f"sqlite:///{directory / 'cinema.db'}"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", url)
+        import database
+        import models  # noqa: F401  registers the tables on Base
+
+        assert str(database.engine.url) == url
+        database.Base.metadata.create_all(bind=database.engine)
+        yield url
+        database.engine.dispose()
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,92 @@
+# tests/test_legend_payload.py
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("playwright")
+from scraper import legend_scraper  # noqa: E402
+from scraper.legend_scraper import ResponseCapture, payload_showtimes  # noqa: E402
+
+MOVIE = {"title": "Dune: Part Two", "url": "https://www.legend.com.kh/movies/dune-part-two-1042"}
+
+# one response holding two movies' sessions plus an analytics object
+MIXED = {
+    "data": {
+        "movies": [
+            {"id": 1042, "title": "Dune: Part Two", "cinemas": [
+                {"name": "Legend Toul Kork", "sessions": [
+                    {"date": "2030-01-02", "showTime": "19:30", "hall": "Hall 3", "format": "2D"},
+                ]},
+            ]},
+            {"id": 2077, "title": "Kung Fu Panda 4", "cinemas": [
+                {"name": "Legend Toul Kork", "sessions": [
+                    {"date": "2030-01-02", "showTime": "14:00", "hall": "Hall 1"},
+                ]},
+            ]},
+        ],
+        "sessions": [
+            {"movieId": 2077, "cinema": "Legend Midtown", "startTime": "2030-01-02T08:00:00Z"},
+            {"movieId": "1042", "cinema": "Legend Midtown", "startTime": "2030-01-02T13:00:00Z"},
+        ],
+    },
+    "analytics": {"event": "page_view", "time": "2030-01-02T03:04:05Z"},
+}
+
+
+def test_mixed_payload_yields_only_the_pages_movie():
+    records = list(payload_showtimes(MIXED, MOVIE))
+
+    assert [(r.movie_title, r.cinema_name, r.hall, r.start_time) for r in records] == [
+        ("Dune: Part Two", "Legend Toul Kork", "Hall 3", datetime(2030, 1, 2, 19, 30)),
+        ("Dune: Part Two", "Legend Midtown", None, datetime(2030, 1, 2, 20, 0)),
+    ]
+
+
+def test_movie_matches_by_title_when_ids_differ():
+    payload = {"movie": {"id": "x-9", "name": "DUNE - Part Two", "sessions": [{"time": "10:00",
+                                                                              "date": "2030-01-02"}]}}
+    assert len(list(payload_showtimes(payload, MOVIE))) == 1
+
+
+def test_unscoped_showtimes_need_a_movie_endpoint():
+    payload = [{"cinema": "Legend Toul Kork", "date": "2030-01-02", "showTime": "19:30"}]
+
+    assert list(payload_showtimes(payload, MOVIE)) == []
+    assert len(list(payload_showtimes(payload, MOVIE, matched=True))) == 1
+
+
+class _Request:
+    resource_type = "fetch"
+
+
+class _Response:
+    request = _Request()
+    ok = True
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, url):
+        self.url = url
+
+
+class _Page:
+    def on(self, event, handler):
+        pass
+
+    def remove_listener(self, event, handler):
+        pass
+
+
+def test_capture_reads_only_showtime_endpoints(monkeypatch):
+    read = []
+    monkeypatch.setattr(legend_scraper.asyncio, "ensure_future", read.append)
+    monkeypatch.setattr(ResponseCapture, "_read", lambda self, response: response.url)
+    capture = ResponseCapture(_Page())
+
+    for url in ("https://www.legend.com.kh/api/movies/1042/showtimes?date=2030-01-02",
+                "https://api.legend.com.kh/v1/sessions",
+                "https://www.google-analytics.com/g/collect?en=page_view",
+                "https://www.legend.com.kh/api/movies/recommended"):
+        capture._on_response(_Response(url))
+
+    assert read == ["https://www.legend.com.kh/api/movies/1042/showtimes?date=2030-01-02",
+                    "https://api.legend.com.kh/v1/sessions"]
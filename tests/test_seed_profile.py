@@ -0,0 +1,52 @@
+# tests/test_seed_profile.py
+import json
+
+import pytest
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ('UPDATE showtimes SET version_label=? WHERE showtimes.id = ?', ("UPDATE", "showtimes")),
+    ('UPDATE "data_generation" SET value=?', ("UPDATE", "data_generation")),
+    ("INSERT INTO movies (title) VALUES (?)", ("INSERT", "movies")),
+    ("SELECT showtimes.id\nFROM showtimes JOIN cinemas ON 1", ("SELECT", "showtimes")),
+    ("DELETE FROM booking_links WHERE id IN (?)", ("DELETE", "booking_links")),
+])
+def test_statement_kind_and_table(database_url, statement, expected):
+    from seed_profile import _STATEMENT_RE
+
+    m = _STATEMENT_RE.match(statement)
+    assert ((m.group(1) or m.group(3)).upper(), m.group(2) or m.group(4)) == expected
+
+
+def test_profile_counts_updates(database_url, tmp_path):
+    import benchmark
+    from seed_from_json import seed_file
+    from seed_profile import SeedProfiler
+
+    path = tmp_path / "profile.json"
+    document = benchmark.synthetic_document("Profile", movies=1, with_urls=False)
+    path.write_text(json.dumps(document))
+    seed_file(str(path), "Profile Cinema")
+
+    # the same showtimes in another version are updated in place
+    for movie in document["movies"]:
+        for day in movie["dates"]:
+            for cinema in day["cinemas"]:
+                for session in cinema["sessions"]:
+                    session["version_label"] = "3D"
+    path.write_text(json.dumps(document))
+
+    profiler = SeedProfiler()
+    profiler.start()
+    try:
+        seed_file(str(path), "Profile Cinema", profiler=profiler)
+    finally:
+        profiler.stop()
+
+    assert profiler.statements["showtimes"]["UPDATE"][0] >= 1
+    assert profiler.statements["data_generation"]["UPDATE"][0] >= 1
+
+    lines = profiler.report().splitlines()
+    header = next(line for line in lines if line.startswith("table ")).split()
+    showtimes = next(line for line in lines if line.startswith("showtimes ")).split()
+    assert dict(zip(header, showtimes))["UPDATE"] != "0"
@@ -0,0 +1,79 @@
+# tests/test_showtimes_queries.py
+import asyncio
+import json
+import shutil
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+LIMIT = 20
+# showtimes whose booking links each path loads: the ORM's selectinload
+# covers every fetched row, the look-ahead one included
+LINKED_ROWS = {"orm": LIMIT + 1, "core": LIMIT}
+
+
+@pytest.fixture(scope="module")
+def db_engine(database_url, tmp_path_factory):
+    import benchmark
+    from database import engine
+
+    # Prime, Legend (with booking links) and Major files, seeded as the CLI does
+    directory = tmp_path_factory.mktemp("seed")
+    benchmark.write_seed_files(str(directory), movies=2)
+    benchmark.run_seeder(str(directory), database_url, [])
+    yield engine
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _links_of_first(db_engine, n):
+    from sqlalchemy import func, select
+
+    from models import BookingLink, Showtime
+
+    first = select(Showtime.id).order_by(Showtime.start_time, Showtime.id).limit(n).subquery()
+    with db_engine.connect() as conn:
+        return conn.scalar(select(func.count()).where(BookingLink.showtime_id.in_(select(first.c.id))))
+
+
+def _render(fn):
+    from database import SessionLocal
+
+    async def render():
+        db = SessionLocal()
+        try:
+            return await fn(db, None, LIMIT)
+        finally:
+            db.close()
+
+    return asyncio.run(render())
+
+
+@pytest.mark.parametrize("path", ["orm", "core"])
+def test_one_page_takes_two_statements_without_row_explosion(db_engine, path):
+    import benchmark
+    import fast_read
+    import main
+
+    fn = {"orm": main.showtimes_page_orm, "core": fast_read.showtimes_page}[path]
+    # warm up the generation and search lookups so only the page is measured
+    _render(fn)
+
+    captured, detach = benchmark.capture_statements(db_engine)
+    try:
+        body = _render(fn)
+    finally:
+        detach()
+
+    page = json.loads(body)
+    with db_engine.connect() as conn:
+        rows = [len(conn.exec_driver_sql(sql, params).all()) for sql, params in captured]
+    links = sum(len(item["booking_links"]) for item in page["items"])
+
+    assert len(page["items"]) == LIMIT
+    assert page["next_cursor"]
+    assert links > 0
+    assert links == _links_of_first(db_engine, LIMIT)
+    # page query (limit + 1 look-ahead), then one query for the booking links
+    assert len(captured) == 2
+    assert rows == [LIMIT + 1, _links_of_first(db_engine, LINKED_ROWS[path])]